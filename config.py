@@ -17,6 +17,7 @@ BrooksQuant 配置管理模块
 
 import logging
 import os
+import sys
 from datetime import datetime
 from dataclasses import dataclass
 from typing import List, Optional
@@ -34,8 +35,16 @@ load_dotenv()
 # 运行模式检测
 # ============================================================================
 
+# 布尔型环境变量的真值集合
+_TRUE = frozenset({"1", "true", "yes", "on", "t", "y"})
+
+
+def _env_bool(name: str, default: str = "false") -> bool:
+    return os.environ.get(name, default).strip().lower() in _TRUE
+
+
 # 观察模式：设置为 True 时只模拟交易，不实际下单
-OBSERVE_MODE = os.getenv("OBSERVE_MODE", "false").lower() == "true"
+OBSERVE_MODE = _env_bool("OBSERVE_MODE")
 
 
 # ============================================================================
@@ -108,7 +117,7 @@ def get_redis_url() -> Optional[str]:
 REDIS_URL: Optional[str] = get_redis_url()
 
 # Delta 订单流分析开关（默认关闭；启用时需配置 Redis）
-DELTA_ENABLED = os.getenv("DELTA_ENABLED", "false").lower() in ("true", "1", "yes")
+DELTA_ENABLED = _env_bool("DELTA_ENABLED")
 if DELTA_ENABLED and REDIS_URL is None:
     raise RuntimeError(
         "DELTA_ENABLED=true 但 Redis 未配置。"
@@ -224,6 +233,43 @@ LARGE_BALANCE_POSITION_PCT = TRADING_CONFIG["large_balance_position_pct"]
 FEE_RATE_MARKET = TRADING_CONFIG["fee_rate_market"]
 FEE_RATE_LIMIT = TRADING_CONFIG["fee_rate_limit"]
 
+
+@dataclass(frozen=True, slots=True)
+class RuntimeConfig:
+    """主入口使用的运行参数快照（只读）"""
+    observe_mode: bool
+    symbol: str
+    kline_interval: str
+    observe_balance: float
+    position_size_percent: float
+    leverage: int
+
+
+def load_runtime_config() -> RuntimeConfig:
+    """由已解析、校验过的 TRADING_CONFIG / OBSERVE_MODE 构建 RuntimeConfig"""
+    return RuntimeConfig(
+        observe_mode=OBSERVE_MODE,
+        symbol=TRADING_CONFIG["symbol"],
+        kline_interval=TRADING_CONFIG["interval"],
+        observe_balance=TRADING_CONFIG["observe_balance"],
+        position_size_percent=TRADING_CONFIG["position_size_percent"],
+        leverage=TRADING_CONFIG["leverage"],
+    )
+
+# ============================================================================
+# 异步队列容量
+# ============================================================================
+# 每用户收件箱（workers.inbox.UserInbox）中信号 / 平仓请求的积压上限：
+# 信号积压满时 kline_producer 丢弃该条信号并计数，平仓请求积压满时生产者等待（背压）
+KLINE_QUEUE_MAX = int(os.getenv("KLINE_QUEUE_MAX", "256"))
+CLOSE_QUEUE_MAX = int(os.getenv("CLOSE_QUEUE_MAX", "64"))
+# BinanceSocketManager 内部消息队列（必须通过构造参数 max_queue_size 传入，类属性无效）
+BSM_QUEUE_SIZE = int(os.getenv("BSM_QUEUE_SIZE", "10000"))
+if KLINE_QUEUE_MAX <= 0 or CLOSE_QUEUE_MAX <= 0:
+    raise RuntimeError(
+        f"KLINE_QUEUE_MAX / CLOSE_QUEUE_MAX 必须大于 0，当前值: {KLINE_QUEUE_MAX} / {CLOSE_QUEUE_MAX}"
+    )
+
 # ============================================================================
 # 止盈止损执行方式（已改为程序执行，不挂委托）
 # ============================================================================
@@ -268,8 +314,8 @@ def setup_logging() -> str:
     logger.setLevel(log_level)
     logger.handlers.clear()
     
-    # 控制台处理器
-    console_handler = logging.StreamHandler()
+    # 控制台处理器（stdout，启动横幅等只经日志输出一次）
+    console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(log_level)
     console_handler.setFormatter(logging.Formatter(log_format, date_format))
     logger.addHandler(console_handler)
@@ -34,13 +34,15 @@ from binance import AsyncClient, BinanceSocketManager
 from binance.exceptions import ReadLoopClosed
 
 # 注意：BinanceSocketManager 的队列大小必须在构造函数中通过 max_queue_size 参数设置
-# 类属性 QUEUE_SIZE 在新版本中无效，需要在创建实例时传入 max_queue_size=10000
+# 类属性 QUEUE_SIZE 在新版本中无效，统一使用 config.BSM_QUEUE_SIZE
+from config import BSM_QUEUE_SIZE
 
-# 尝试导入 websockets 异常
+# 尝试导入 websockets 异常；不可用时为空元组（不匹配任何异常），交给通用异常分支处理
 try:
     from websockets.exceptions import ConnectionClosed
+    _WS_CLOSED = (ConnectionClosed,)
 except ImportError:
-    ConnectionClosed = Exception  # type: ignore
+    _WS_CLOSED = ()
 
 
 class DeltaTrend(Enum):
@@ -295,7 +297,7 @@ class DeltaAnalyzer:
         - 缓存历史平均值
         """
         async with self._lock:
-            current_ts = int(time.time() * 1000)
+            current_ts = time.time_ns() // 1_000_000
             
             # 批量清理
             await self._batch_cleanup(current_ts)
@@ -856,7 +858,7 @@ async def aggtrade_worker(symbol: str = "BTCUSDT", redis_url: Optional[str] = No
                     raise
                 
                 # 创建 WebSocket 管理器（必须在构造函数中传入 max_queue_size）
-                bsm = BinanceSocketManager(client, user_timeout=60, max_queue_size=10000)
+                bsm = BinanceSocketManager(client, user_timeout=60, max_queue_size=BSM_QUEUE_SIZE)
                 
                 # 订阅 aggTrade 数据流
                 trade_socket = bsm.aggtrade_socket(symbol)
@@ -908,7 +910,9 @@ async def aggtrade_worker(symbol: str = "BTCUSDT", redis_url: Optional[str] = No
                             price = float(msg["p"])
                             qty = float(msg["q"])
                             is_buyer_maker = msg.get("m", False)  # true=卖方主动, false=买方主动
-                            timestamp = msg.get("T", int(time.time() * 1000))
+                            timestamp = msg.get("T")
+                            if timestamp is None:
+                                timestamp = time.time_ns() // 1_000_000
                             
                             # 添加到批次
                             trade_batch.append((timestamp, price, qty, is_buyer_maker))
@@ -1013,7 +1017,7 @@ async def aggtrade_worker(symbol: str = "BTCUSDT", redis_url: Optional[str] = No
                     f"{delay}秒后重连 ({reconnect_attempt}/{max_reconnect_attempts})"
                 )
                 await asyncio.sleep(delay)
-            except ConnectionClosed as e:
+            except _WS_CLOSED as e:
                 reconnect_attempt += 1
                 delay = min(base_delay * (2 ** reconnect_attempt), 60)
                 logging.warning(
@@ -12,6 +12,7 @@ Al Brooks 价格行为策略模块（基于 MT5 EA 精确实现）
 - scan_market: ScanMarket 扫描入口
 - stop_loss: Brooks 止损 + 软止损
 - take_profit: Scalp TP1 + Measured Move TP2
+- jit: 可选 Numba 加速（未安装时退化为纯 Python）
 """
 
 from .constants import (
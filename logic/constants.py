@@ -75,24 +75,28 @@ DIR_LONG: int = 1
 DIR_SHORT: int = -1
 
 
+# SignalType → "buy" / "sell" / ""，导入时按名称后缀一次性建表
+_SIGNAL_SIDE: dict[SignalType, str] = {
+    sig: ("buy" if sig.name.endswith("_BUY")
+          else "sell" if sig.name.endswith("_SELL") else "")
+    for sig in SignalType
+}
+
+
 def signal_side(sig: SignalType) -> str:
-    if sig == SignalType.NONE:
-        return ""
-    name = sig.name
-    if name.endswith("_BUY"):
-        return "buy"
-    if name.endswith("_SELL"):
-        return "sell"
-    return ""
+    return _SIGNAL_SIDE.get(sig, "")
+
+
+_SPIKE_SIGNALS = frozenset({SignalType.SPIKE_BUY, SignalType.SPIKE_SELL})
 
 
 def is_spike_signal(sig: SignalType) -> bool:
-    return sig in (SignalType.SPIKE_BUY, SignalType.SPIKE_SELL)
+    return sig in _SPIKE_SIGNALS
 
 
 # ── 数据类 ────────────────────────────────────────────────────────────
 
-@dataclass
+@dataclass(slots=True)
 class SignalResult:
     signal_type: SignalType = SignalType.NONE
     direction: int = 0            # DIR_LONG / DIR_SHORT
@@ -103,14 +107,14 @@ class SignalResult:
     reason: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class SwingPoint:
     price: float
     bar_index: int
     is_high: bool
 
 
-@dataclass
+@dataclass(slots=True)
 class MeasuringGapInfo:
     gap_high: float = 0.0
     gap_low: float = 0.0
@@ -253,3 +257,10 @@ REVERSAL_ALLOWED_STATES = frozenset({
     MarketState.TRADING_RANGE,
     MarketState.FINAL_FLAG,
 })
+
+# 强趋势状态 → 止损只用信号棒 + ATR 缓冲，不参考 swing
+STRONG_STOP_STATES = frozenset({
+    MarketState.STRONG_TREND,
+    MarketState.BREAKOUT,
+    MarketState.TIGHT_CHANNEL,
+})
@@ -9,6 +9,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 
+import numpy as np
 import pandas as pd
 
 from logic.constants import (
@@ -72,32 +73,26 @@ class BarbWireFilter:
         o = opens.values
         c = closes.values
 
-        small = doji = overlap = 0
-        rh = h[-2]
-        rl = l[-2]
-        check = BARB_WIRE_MIN_BARS + 2
-        for i in range(1, min(check + 1, n)):
-            idx = -1 - i
-            rng = h[idx] - l[idx]
-            body = abs(c[idx] - o[idx])
-            if rng <= 0:
-                continue
-            if h[idx] > rh:
-                rh = h[idx]
-            if l[idx] < rl:
-                rl = l[idx]
-            is_small = rng < atr * BARB_WIRE_RANGE_RATIO or body / rng < BARB_WIRE_BODY_RATIO
-            is_doji = body / rng < 0.15
-            if is_small:
-                small += 1
-            if is_doji:
-                doji += 1
-            if i > 1:
-                prev = idx + 1
-                ov_h = min(h[idx], h[prev])
-                ov_l = max(l[idx], l[prev])
-                if ov_h > ov_l and rng > 0 and (ov_h - ov_l) / rng > 0.5:
-                    overlap += 1
+        # bar[1..w] 的幅度 / 实体一次算好（由近及远），再整体统计
+        w = min(BARB_WIRE_MIN_BARS + 2, n - 1)
+        hs = h[-2:-2 - w:-1]
+        ls = l[-2:-2 - w:-1]
+        rng = hs - ls
+        body = np.abs(c[-2:-2 - w:-1] - o[-2:-2 - w:-1])
+        valid = rng > 0
+        ratio = body / np.where(valid, rng, 1.0)
+
+        rh = max(h[-2], hs[valid].max()) if valid.any() else h[-2]
+        rl = min(l[-2], ls[valid].min()) if valid.any() else l[-2]
+        small = int(np.count_nonzero(
+            valid & ((rng < atr * BARB_WIRE_RANGE_RATIO) | (ratio < BARB_WIRE_BODY_RATIO))
+        ))
+        doji = int(np.count_nonzero(valid & (ratio < 0.15)))
+        # 与更近一根的重叠（首根 bar[1] 不参与）
+        ov = np.minimum(hs[1:], hs[:-1]) - np.maximum(ls[1:], ls[:-1])
+        overlap = int(np.count_nonzero(
+            valid[1:] & (ov > 0) & (ov / np.where(valid[1:], rng[1:], 1.0) > 0.5)
+        ))
 
         total_rng = rh - rl
         high_overlap = total_rng < atr * 1.5 or overlap >= BARB_WIRE_MIN_BARS - 1
@@ -150,14 +145,16 @@ class GapBar20Rule:
 
     def calculate_gap_count(
         self, closes: pd.Series, lows: pd.Series, highs: pd.Series,
-        ema: pd.Series, atr: float,
+        ema: np.ndarray, atr: float,
     ) -> int:
         if atr <= 0:
             return 0
-        n = len(closes)
+        c = closes.values
+        e = ema
+        n = len(c)
         threshold = atr * 0.3
-        c1 = closes.iloc[-2]
-        e1 = ema.iloc[-2]
+        c1 = c[-2]
+        e1 = e[-2]
         above = c1 > e1 + threshold
         below = c1 < e1 - threshold
         if not above and not below:
@@ -165,40 +162,47 @@ class GapBar20Rule:
             self.gap_count_extreme = 0.0
             return 0
 
+        h = highs.values
+        l = lows.values
         extreme = float('-inf') if above else float('inf')
         count = 0
         maxlb = min(50, n - 1)
         for i in range(1, maxlb + 1):
             idx = -1 - i
-            bar_ema = ema.iloc[idx]
+            bar_ema = e[idx]
             if above:
-                if lows.iloc[idx] > bar_ema:
+                if l[idx] > bar_ema:
                     count += 1
-                    if highs.iloc[idx] > extreme:
-                        extreme = float(highs.iloc[idx])
+                    if h[idx] > extreme:
+                        extreme = h[idx]
                 else:
                     break
             else:
-                if highs.iloc[idx] < bar_ema:
+                if h[idx] < bar_ema:
                     count += 1
-                    if lows.iloc[idx] < extreme:
-                        extreme = float(lows.iloc[idx])
+                    if l[idx] < extreme:
+                        extreme = l[idx]
                 else:
                     break
         self.gap_count = count
-        self.gap_count_extreme = extreme
+        self.gap_count_extreme = float(extreme)
         return count
 
     def update(
         self, closes: pd.Series, highs: pd.Series, lows: pd.Series,
-        opens: pd.Series, ema: pd.Series, atr: float,
+        opens: pd.Series, ema: np.ndarray, atr: float,
     ) -> None:
         if not ENABLE_20_GAP_RULE or atr <= 0:
             return
-        n = len(closes)
+        c = closes.values
+        e = ema
+        h = highs.values
+        l = lows.values
+        o = opens.values
+        n = len(c)
         threshold = atr * 0.3
-        c1 = closes.iloc[-2]
-        e1 = ema.iloc[-2]
+        c1 = c[-2]
+        e1 = e[-2]
         above = c1 > e1 + threshold
         below = c1 < e1 - threshold
         touching = not above and not below
@@ -218,33 +222,30 @@ class GapBar20Rule:
                     self.first_pullback_blocked = True
                     self.waiting_for_recovery = True
                     self.pullback_extreme = float(
-                        lows.iloc[-2] if self.overextend_dir == "up" else highs.iloc[-2]
+                        l[-2] if self.overextend_dir == "up" else h[-2]
                     )
                 self.consolidation_count += 1
 
             if self.waiting_for_recovery:
                 recovered = False
                 if self.consolidation_count >= CONSOLIDATION_BARS and atr > 0:
-                    rH = float(highs.iloc[-2])
-                    rL = float(lows.iloc[-2])
-                    for i in range(2, min(CONSOLIDATION_BARS + 1, n)):
-                        if highs.iloc[-1 - i] > rH:
-                            rH = float(highs.iloc[-1 - i])
-                        if lows.iloc[-1 - i] < rL:
-                            rL = float(lows.iloc[-1 - i])
+                    # bar[1..CONSOLIDATION_BARS] 区间高低点
+                    w = min(CONSOLIDATION_BARS + 1, n)
+                    rH = h[-w:-1].max() if w > 1 else h[-2]
+                    rL = l[-w:-1].min() if w > 1 else l[-2]
                     if (rH - rL) <= atr * CONSOLIDATION_RANGE:
                         recovered = True
                 if not recovered and self.pullback_extreme > 0 and atr > 0:
                     tol = atr * 0.3
                     if self.overextend_dir == "up":
-                        if (lows.iloc[-2] <= self.pullback_extreme + tol and
-                                lows.iloc[-2] >= self.pullback_extreme - tol and
-                                closes.iloc[-2] > opens.iloc[-2]):
+                        if (l[-2] <= self.pullback_extreme + tol and
+                                l[-2] >= self.pullback_extreme - tol and
+                                c[-2] > o[-2]):
                             recovered = True
                     else:
-                        if (highs.iloc[-2] >= self.pullback_extreme - tol and
-                                highs.iloc[-2] <= self.pullback_extreme + tol and
-                                closes.iloc[-2] < opens.iloc[-2]):
+                        if (h[-2] >= self.pullback_extreme - tol and
+                                h[-2] <= self.pullback_extreme + tol and
+                                c[-2] < o[-2]):
                             recovered = True
                 if not recovered:
                     if (self.overextend_dir == "up" and below) or (self.overextend_dir == "down" and above):
@@ -257,10 +258,10 @@ class GapBar20Rule:
             if self.gap_count == 0:
                 should_reset = True
             elif self.overextend_dir == "up" and below and n >= 3:
-                if closes.iloc[-3] < ema.iloc[-3] - threshold:
+                if c[-3] < e[-3] - threshold:
                     should_reset = True
             elif self.overextend_dir == "down" and above and n >= 3:
-                if closes.iloc[-3] > ema.iloc[-3] + threshold:
+                if c[-3] > e[-3] + threshold:
                     should_reset = True
             if should_reset:
                 self._reset()
@@ -339,24 +340,16 @@ class SignalCooldownTracker:
 
     def check(
         self, side: str, current_price: float, atr: float,
-        highs: pd.Series, lows: pd.Series,
+        highs: np.ndarray, lows: np.ndarray,
     ) -> bool:
-        n = len(highs)
+        """highs/lows 为 ndarray，仅在近价重复分支才读取。"""
         if side == "buy":
             if self.bar_counter - self.last_buy_bar < SIGNAL_COOLDOWN:
                 return False
             if self.last_buy_price > 0 and atr > 0:
                 diff = abs(current_price - self.last_buy_price)
                 if diff < atr * 1.5:
-                    rh = float(highs.iloc[-2])
-                    rl = float(lows.iloc[-2])
-                    cb = min(SIGNAL_COOLDOWN + 2, n - 1)
-                    for i in range(2, cb + 1):
-                        if highs.iloc[-1 - i] > rh:
-                            rh = float(highs.iloc[-1 - i])
-                        if lows.iloc[-1 - i] < rl:
-                            rl = float(lows.iloc[-1 - i])
-                    if rh - rl < atr * 2.0:
+                    if _recent_range(highs, lows) < atr * 2.0:
                         return False
         else:
             if self.bar_counter - self.last_sell_bar < SIGNAL_COOLDOWN:
@@ -364,15 +357,7 @@ class SignalCooldownTracker:
             if self.last_sell_price > 0 and atr > 0:
                 diff = abs(self.last_sell_price - current_price)
                 if diff < atr * 1.5:
-                    rh = float(highs.iloc[-2])
-                    rl = float(lows.iloc[-2])
-                    cb = min(SIGNAL_COOLDOWN + 2, n - 1)
-                    for i in range(2, cb + 1):
-                        if highs.iloc[-1 - i] > rh:
-                            rh = float(highs.iloc[-1 - i])
-                        if lows.iloc[-1 - i] < rl:
-                            rl = float(lows.iloc[-1 - i])
-                    if rh - rl < atr * 2.0:
+                    if _recent_range(highs, lows) < atr * 2.0:
                         return False
         return True
 
@@ -385,6 +370,13 @@ class SignalCooldownTracker:
             self.last_sell_price = price
 
 
+
+def _recent_range(highs: np.ndarray, lows: np.ndarray) -> float:
+    """bar[1..SIGNAL_COOLDOWN+2] 的高低点区间。"""
+    w = min(SIGNAL_COOLDOWN + 2, len(highs) - 1) + 1
+    return float(highs[-w:-1].max()) - float(lows[-w:-1].min())
+
+
 # ── Measuring Gap ─────────────────────────────────────────────────
 
 @dataclass
@@ -396,12 +388,14 @@ class MeasuringGapTracker:
                opens: pd.Series, closes: pd.Series, atr: float) -> None:
         if not ENABLE_MEASURING_GAP or atr <= 0 or len(highs) < 3:
             return
+        h = highs.values
+        l = lows.values
         if self.has_gap and self.gap.is_valid:
             self.gap.bar_index += 1
             mid = (self.gap.gap_high + self.gap.gap_low) / 2.0
-            if self.gap.direction == "up" and lows.iloc[-2] < mid:
+            if self.gap.direction == "up" and l[-2] < mid:
                 self.gap.is_valid = False
-            if self.gap.direction == "down" and highs.iloc[-2] > mid:
+            if self.gap.direction == "down" and h[-2] > mid:
                 self.gap.is_valid = False
             if self.gap.bar_index > 20:
                 self.gap.is_valid = False
@@ -409,12 +403,12 @@ class MeasuringGapTracker:
             if self.gap.is_valid:
                 return
 
-        h1 = highs.iloc[-2]
-        l1 = lows.iloc[-2]
-        o1 = opens.iloc[-2]
-        c1 = closes.iloc[-2]
-        h2 = highs.iloc[-3]
-        l2 = lows.iloc[-3]
+        h1 = h[-2]
+        l1 = l[-2]
+        o1 = opens.values[-2]
+        c1 = closes.values[-2]
+        h2 = h[-3]
+        l2 = l[-3]
         rng = h1 - l1
         if rng <= 0:
             return
@@ -453,9 +447,13 @@ class BreakoutModeTracker:
         if not self.active:
             return
         self.bar_count += 1
-        if self.direction == "up" and highs.iloc[-2] > self.extreme:
-            self.extreme = float(highs.iloc[-2])
-        if self.direction == "down" and lows.iloc[-2] < self.extreme:
-            self.extreme = float(lows.iloc[-2])
+        if self.direction == "up":
+            h1 = highs.values[-2]
+            if h1 > self.extreme:
+                self.extreme = float(h1)
+        elif self.direction == "down":
+            l1 = lows.values[-2]
+            if l1 < self.extreme:
+                self.extreme = float(l1)
         if self.bar_count >= BREAKOUT_MODE_BARS:
             self.active = False
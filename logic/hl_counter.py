@@ -9,6 +9,7 @@ Brooks Push 定义:
 """
 from __future__ import annotations
 
+import math
 from dataclasses import dataclass
 
 import pandas as pd
@@ -20,14 +21,15 @@ from logic.swing_tracker import SwingTracker
 @dataclass
 class HLCounter:
     # H 计数
+    # h_last_swing_high / l_last_swing_low 用 ∓inf 作"未设置"哨兵，省去 == 0 分支
     h_count: int = 0
-    h_last_swing_high: float = 0.0
+    h_last_swing_high: float = -math.inf
     h_last_pullback_low: float = 0.0
     h_last_pb_low_bar: int = -1
 
     # L 计数
     l_count: int = 0
-    l_last_swing_low: float = 0.0
+    l_last_swing_low: float = math.inf
     l_last_bounce_high: float = 0.0
     l_last_bounce_bar: int = -1
 
@@ -48,10 +50,10 @@ class HLCounter:
         reset_extreme = atr * HL_RESET_NEW_EXTREME_ATR
         min_pullback = atr * HL_MIN_PULLBACK_ATR
 
-        h1 = highs.iloc[-2]
-        l1_val = lows.iloc[-2]
-        o1 = opens.iloc[-2]
-        c1 = closes.iloc[-2]
+        h1 = highs.values[-2]
+        l1_val = lows.values[-2]
+        o1 = opens.values[-2]
+        c1 = closes.values[-2]
         rng = h1 - l1_val
         rng_safe = max(rng, 1e-10)
 
@@ -85,7 +87,7 @@ class HLCounter:
 
         # --- L 计数 ---
         if sl1 > 0 and sl2 > 0 and sh1 > 0:
-            if l1_val < sl1 and sh1 > sl2 and (self.l_last_swing_low == 0 or sl1 < self.l_last_swing_low):
+            if l1_val < sl1 and sh1 > sl2 and sl1 < self.l_last_swing_low:
                 bounce_depth = sh1 - sl2
                 if bounce_depth >= min_pullback:
                     self.l_count += 1
@@ -104,12 +106,12 @@ class HLCounter:
 
     def _reset_h(self) -> None:
         self.h_count = 0
-        self.h_last_swing_high = 0.0
+        self.h_last_swing_high = -math.inf
         self.h_last_pullback_low = 0.0
 
     def _reset_l(self) -> None:
         self.l_count = 0
-        self.l_last_swing_low = 0.0
+        self.l_last_swing_low = math.inf
         self.l_last_bounce_high = 0.0
 
     @staticmethod
@@ -2,7 +2,8 @@
 技术指标计算 — EMA / ATR
 
 EA 仅使用 EMA(20) 和 ATR(20)，这里保持最简实现。
-优先使用 TA-Lib (C 加速)，回退到 Pandas 纯 Python 计算。
+优先使用 TA-Lib (C 加速)，回退到单次递推内核（有 numba 时 JIT 编译）。
+step_ema / step_atr 为逐根递推版本，供流式更新使用。
 """
 from __future__ import annotations
 
@@ -11,21 +12,80 @@ import logging
 import numpy as np
 import pandas as pd
 
+from logic.jit import njit
+
 try:
     import talib
     _TALIB = True
 except ImportError:
     _TALIB = False
-    logging.warning("TA-Lib 未安装，使用 Pandas 备用计算")
+    logging.warning("TA-Lib 未安装，使用递推备用计算")
 
 
-def compute_ema(close: pd.Series, period: int = 20) -> pd.Series:
+def _first_valid(arr: np.ndarray) -> int:
+    """首个非 NaN 下标（TA-Lib 只产生前导 NaN）；全 NaN 时返回 len。"""
+    if len(arr) == 0 or not np.isnan(arr[0]):
+        return 0
+    fv = int(np.argmax(~np.isnan(arr)))
+    return fv if fv > 0 else len(arr)
+
+
+@njit(cache=True)
+def _ewm(x: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    ewm(adjust=False) 单次递推：s[i] = s[i-1] + alpha * (x[i] - s[i-1])。
+    与 step_ema / step_atr 同式，整段计算与逐根递推结果逐位一致。
+    """
+    out = np.empty_like(x)
+    if len(x) == 0:
+        return out
+    s = x[0]
+    out[0] = s
+    for i in range(1, len(x)):
+        s = s + alpha * (x[i] - s)
+        out[i] = s
+    return out
+
+
+def compute_ema_np(close: np.ndarray, period: int = 20) -> np.ndarray:
+    """EMA，ndarray 进出（close 需为 float64，只读，可直接传入列视图）。"""
     if _TALIB:
-        arr = talib.EMA(close.values.astype(np.float64), timeperiod=period)
-        ema = pd.Series(arr, index=close.index)
+        out = talib.EMA(close, timeperiod=period)
+        # 前导 NaN 用首个有效值原地回填
+        fv = _first_valid(out)
+        if 0 < fv < len(out):
+            out[:fv] = out[fv]
+        return out
+    return _ewm(close, ema_alpha(period))
+
+
+def compute_atr_np(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    period: int = 20,
+) -> np.ndarray:
+    """ATR，ndarray 进出（输入需为 float64，只读）。前导 NaN 用当根 high - low 填充。"""
+    if _TALIB:
+        out = talib.ATR(high, low, close, timeperiod=period)
     else:
-        ema = close.ewm(span=period, adjust=False).mean()
-    return ema.ffill().bfill()
+        # ndarray 上直接求 TR，避免三个中间 Series + concat
+        # fmax 跳过 NaN（与 DataFrame.max 一致），首根 TR = high - low
+        c_prev = np.empty_like(high)
+        if len(high):
+            c_prev[0] = np.nan
+            c_prev[1:] = close[:-1]
+        tr = np.fmax(np.fmax(high - low, np.abs(high - c_prev)), np.abs(low - c_prev))
+        out = _ewm(tr, 2.0 / (period + 1))
+    fv = _first_valid(out)
+    if fv:
+        out[:fv] = high[:fv] - low[:fv]
+    return out
+
+
+def compute_ema(close: pd.Series, period: int = 20) -> pd.Series:
+    arr = compute_ema_np(close.to_numpy(dtype=np.float64, copy=False), period)
+    return pd.Series(arr, index=close.index)
 
 
 def compute_atr(
@@ -34,23 +94,35 @@ def compute_atr(
     close: pd.Series,
     period: int = 20,
 ) -> pd.Series:
-    if _TALIB:
-        arr = talib.ATR(
-            high.values.astype(np.float64),
-            low.values.astype(np.float64),
-            close.values.astype(np.float64),
-            timeperiod=period,
-        )
-        atr = pd.Series(arr, index=close.index)
-    else:
-        tr1 = high - low
-        tr2 = (high - close.shift(1)).abs()
-        tr3 = (low - close.shift(1)).abs()
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        atr = tr.ewm(span=period, adjust=False).mean()
-    initial_tr = high - low
-    atr = atr.fillna(initial_tr).ffill().bfill()
-    return atr
+    arr = compute_atr_np(
+        high.to_numpy(dtype=np.float64, copy=False),
+        low.to_numpy(dtype=np.float64, copy=False),
+        close.to_numpy(dtype=np.float64, copy=False),
+        period,
+    )
+    return pd.Series(arr, index=close.index)
+
+
+def ema_alpha(period: int) -> float:
+    return 2.0 / (period + 1)
+
+
+def atr_alpha(period: int) -> float:
+    """TA-Lib ATR 为 Wilder 平滑 (1/n)；备用路径为 ewm(span=n) 等价递推。"""
+    return 1.0 / period if _TALIB else 2.0 / (period + 1)
+
+
+@njit(cache=True)
+def step_ema(prev_ema: float, close: float, alpha: float) -> float:
+    return prev_ema + alpha * (close - prev_ema)
+
+
+@njit(cache=True)
+def step_atr(
+    prev_atr: float, high: float, low: float, prev_close: float, alpha: float,
+) -> float:
+    tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+    return prev_atr + alpha * (tr - prev_atr)
 
 
 def compute_htf_ema(close_htf: pd.Series, period: int = 20) -> pd.Series:
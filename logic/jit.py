@@ -0,0 +1,26 @@
+"""
+可选 Numba 加速
+
+安装 numba 时 njit 为真实 JIT 编译；未安装时退化为原样返回函数的空装饰器，
+内核保持纯 Python 可运行，结果一致。
+"""
+from __future__ import annotations
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """兼容 @njit 与 @njit(cache=True) 两种写法。"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def _wrap(fn):
+            return fn
+
+        return _wrap
+
+
+__all__ = ["njit", "NUMBA_AVAILABLE"]
@@ -9,7 +9,9 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
+from typing import Optional
 
+import numpy as np
 import pandas as pd
 
 from logic.constants import (
@@ -40,6 +42,10 @@ class MarketStateTracker:
     _locked_state: MarketState = MarketState.CHANNEL
     _hold_bars: int = 0
 
+    # 本根 K 线 bar[1..20] 的 (最高, 最低)，由 _detect_trading_range 算出，
+    # 同一根内随后的 is_ttr 复用，不再重扫窗口；每次 update 开头清空
+    _range20: Optional[tuple[float, float]] = field(default=None, repr=False)
+
     # ── 主入口 ─────────────────────────────────────────────────────
 
     def update(
@@ -48,10 +54,11 @@ class MarketStateTracker:
         lows: pd.Series,
         opens: pd.Series,
         closes: pd.Series,
-        ema: pd.Series,
+        ema: np.ndarray,
         atr_val: float,
         swings: SwingTracker,
     ) -> None:
+        self._range20 = None
         n = len(closes)
         if n < 12 or atr_val <= 0:
             return
@@ -60,7 +67,7 @@ class MarketStateTracker:
         l = lows.values
         o = opens.values
         c = closes.values
-        e = ema.values
+        e = ema
 
         detected = MarketState.CHANNEL
 
@@ -205,34 +212,21 @@ class MarketStateTracker:
         if n < 25 or atr <= 0:
             return False
         lookback = 20
-        rh = h[-2]
-        rl = l[-2]
-        for i in range(2, min(lookback + 1, n)):
-            idx = -1 - i
-            if -idx > n:
-                break
-            if h[idx] > rh:
-                rh = h[idx]
-            if l[idx] < rl:
-                rl = l[idx]
+        # n >= 25 已保证窗口完整：bar[1..lookback] 一次切片取极值
+        rh = h[-(lookback + 1):-1].max()
+        rl = l[-(lookback + 1):-1].min()
+        self._range20 = (rh, rl)
         total = rh - rl
         if total < atr * 2.0:
             return False
         upper = rh - total * 0.2
         lower = rl + total * 0.2
-        touch_h = touch_l = 0
-        crosses = 0
-        prev_above = c[-(lookback + 1)] > e[-(lookback + 1)] if n > lookback else True
-        for i in range(1, min(lookback + 1, n)):
-            idx = -1 - i
-            if h[idx] >= upper:
-                touch_h += 1
-            if l[idx] <= lower:
-                touch_l += 1
-            cur_above = c[idx] > e[idx]
-            if cur_above != prev_above:
-                crosses += 1
-                prev_above = cur_above
+        touch_h = int(np.count_nonzero(h[-(lookback + 1):-1] >= upper))
+        touch_l = int(np.count_nonzero(l[-(lookback + 1):-1] <= lower))
+        # EA 顺序：以 bar[lookback] 为初值，从 bar[1] 向 bar[lookback] 统计穿越次数
+        above = c[-(lookback + 1):] > e[-(lookback + 1):]
+        seq = np.concatenate((above[:1], above[-2::-1]))
+        crosses = int(np.count_nonzero(seq[1:] != seq[:-1]))
         if touch_h >= 2 and touch_l >= 2 and crosses >= 4:
             self.tr_high = rh
             self.tr_low = rl
@@ -246,13 +240,8 @@ class MarketStateTracker:
         rng = h[-2] - l[-2]
         if rng <= 0:
             return False
-        avg_body = 0.0
-        cnt = 0
-        for i in range(2, min(12, n)):
-            avg_body += abs(c[-1 - i] - o[-1 - i])
-            cnt += 1
-        if cnt > 0:
-            avg_body /= cnt
+        # bar[2..11] 平均实体（n >= 12 已保证窗口完整）
+        avg_body = float(np.abs(c[-12:-2] - o[-12:-2]).mean())
         if avg_body > 0 and body > avg_body * 1.5:
             close = c[-2]
             if close > e[-2] and (close - l[-2]) / rng > 0.7:
@@ -310,7 +299,7 @@ class MarketStateTracker:
         tr_range = self.tr_high - self.tr_low
         if tr_range >= atr * TTR_RANGE_ATR_MULT:
             return False
-        overlap = _get_bar_overlap_ratio(highs, lows, 20)
+        overlap = _get_bar_overlap_ratio(highs, lows, 20, self._range20)
         return overlap < TTR_OVERLAP_THRESHOLD
 
     # ── AlwaysIn ──────────────────────────────────────────────────
@@ -463,24 +452,20 @@ def _get_cycle(state: MarketState) -> MarketCycle:
     return MarketCycle.CHANNEL
 
 
-def _get_bar_overlap_ratio(highs: pd.Series, lows: pd.Series, lookback: int = 20) -> float:
+def _get_bar_overlap_ratio(
+    highs: pd.Series, lows: pd.Series, lookback: int = 20,
+    extremes: Optional[tuple[float, float]] = None,
+) -> float:
+    """extremes 为调用方已算好的同窗口 (最高, 最低)，可省去一次极值扫描。"""
     n = len(highs)
     if n < lookback + 1:
         return 1.0
-    h = highs.values
-    l = lows.values
-    rh = h[-2]
-    rl = l[-2]
-    sum_range = 0.0
-    for i in range(1, min(lookback + 1, n)):
-        idx = -1 - i
-        if h[idx] > rh:
-            rh = h[idx]
-        if l[idx] < rl:
-            rl = l[idx]
-        br = h[idx] - l[idx]
-        if br > 0:
-            sum_range += br
+    # bar[1..lookback] 整窗向量化：极值 + 正幅度之和
+    h = highs.values[-(lookback + 1):-1]
+    l = lows.values[-(lookback + 1):-1]
+    rh, rl = extremes if extremes is not None else (h.max(), l.min())
+    br = h - l
+    sum_range = float(br[br > 0].sum())
     total = rh - rl
     if sum_range <= 0 or total <= 0:
         return 1.0
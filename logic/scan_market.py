@@ -2,16 +2,17 @@
 ScanMarket — 严格按 EA 优先级顺序扫描信号
 
 对给定方向 (DIR_LONG / DIR_SHORT) 依次检测 17 类信号，返回第一个有效信号。
+scan_market_both 一次完成 EA 的"先多后空"，两个方向共用数组与门控条件。
 """
 from __future__ import annotations
 
-from typing import Optional
+from typing import Callable, Optional
 
 import pandas as pd
 
 from logic.constants import (
     SignalResult, SignalType, MarketState, MarketCycle,
-    DIR_LONG, DIR_SHORT, signal_side,
+    DIR_LONG, DIR_SHORT,
     ENABLE_SPIKE, ENABLE_H2L2, ENABLE_WEDGE, ENABLE_CLIMAX,
     ENABLE_MTR, ENABLE_FAILED_BO, ENABLE_DTDB, ENABLE_TREND_BAR,
     ENABLE_REV_BAR, ENABLE_II_PATTERN, ENABLE_OUTSIDE_BAR,
@@ -29,6 +30,36 @@ from logic.signals import (
 )
 
 
+# 门控类别
+_G_ALWAYS, _G_NOT_TTR, _G_TR, _G_REV, _G_FINAL_FLAG = range(5)
+
+# EA 优先级顺序：(检测函数, 是否按方向调用, 门控)
+# ENABLE_* 为常量，导入时即裁剪掉关闭的检测
+_SCAN_PLAN: tuple[tuple[Callable, bool, int], ...] = tuple(
+    (fn, directional, gate)
+    for enabled, fn, directional, gate in (
+        (ENABLE_SPIKE, check_spike, False, _G_NOT_TTR),                    # 1
+        (True, check_micro_channel, False, _G_NOT_TTR),                    # 2
+        (ENABLE_H2L2, check_hl_count, True, _G_ALWAYS),                    # 3
+        (ENABLE_BO_PULLBACK, check_breakout_pullback, False, _G_NOT_TTR),  # 4
+        (ENABLE_TREND_BAR, check_trend_bar, False, _G_NOT_TTR),            # 5
+        (ENABLE_GAP_BAR, check_gap_bar, False, _G_NOT_TTR),                # 6
+        (ENABLE_TR_BREAKOUT, check_tr_breakout, False, _G_TR),             # 7
+        (ENABLE_CLIMAX, check_climax, False, _G_ALWAYS),                   # 8
+        (ENABLE_WEDGE, check_wedge, True, _G_REV),                         # 9
+        (ENABLE_MTR, check_mtr, False, _G_REV),                            # 10
+        (ENABLE_FAILED_BO, check_failed_breakout, False, _G_TR),           # 11
+        (ENABLE_DTDB, check_double_top_bottom, True, _G_REV),              # 12
+        (ENABLE_OUTSIDE_BAR, check_outside_bar, False, _G_REV),            # 13
+        (ENABLE_REV_BAR, check_reversal_bar, False, _G_REV),               # 14
+        (ENABLE_II_PATTERN, check_ii_pattern, False, _G_REV),              # 15
+        (ENABLE_MEASURED_MOVE, check_measured_move, False, _G_ALWAYS),     # 16
+        (True, check_final_flag, False, _G_FINAL_FLAG),                    # 17
+    )
+    if enabled
+)
+
+
 def scan_market(
     direction: int,
     highs: pd.Series,
@@ -43,118 +74,67 @@ def scan_market(
     l = lows.values
     o = opens.values
     c = closes.values
-    want = "buy" if direction == DIR_LONG else "sell"
-
-    def _match(r: Optional[SignalResult]) -> Optional[SignalResult]:
-        if r is not None and signal_side(r.signal_type) == want:
-            return r
-        return None
-
-    # 1. Spike (非TTR)
-    if not is_ttr and ENABLE_SPIKE:
-        r = _match(check_spike(h, l, o, c, atr, ctx))
-        if r:
-            return r
-
-    # 2. MicroChannel (非TTR)
-    if not is_ttr:
-        r = _match(check_micro_channel(h, l, o, c, atr, ctx))
-        if r:
-            return r
-
-    # 3. H/L Count
-    if ENABLE_H2L2:
-        r = check_hl_count(h, l, o, c, atr, direction, ctx)
-        if r:
-            return r
-
-    # 4. BreakoutPullback (非TTR)
-    if not is_ttr and ENABLE_BO_PULLBACK:
-        r = _match(check_breakout_pullback(h, l, o, c, atr, ctx))
-        if r:
-            return r
+    return _scan(direction, h, l, o, c, atr, is_ttr, ctx, _allow_reversal(ctx))
 
-    # 5. TrendBarEntry (非TTR)
-    if not is_ttr and ENABLE_TREND_BAR:
-        r = _match(check_trend_bar(h, l, o, c, atr, ctx))
-        if r:
-            return r
 
-    # 6. GapBar (非TTR)
-    if not is_ttr and ENABLE_GAP_BAR:
-        r = _match(check_gap_bar(h, l, o, c, atr, ctx))
-        if r:
-            return r
+def scan_market_both(
+    highs: pd.Series,
+    lows: pd.Series,
+    opens: pd.Series,
+    closes: pd.Series,
+    atr: float,
+    is_ttr: bool,
+    ctx: SignalContext,
+) -> Optional[SignalResult]:
+    """
+    EA 先多后空：数组提取与门控只做一次。
+    检测函数本身仍按方向各跑一遍 —— 它们会写冷却/突破状态，
+    EA 的空头扫描看到的是多头扫描之后的状态，不能直接复用多头结果。
+    """
+    h = highs.values
+    l = lows.values
+    o = opens.values
+    c = closes.values
+    allow_rev = _allow_reversal(ctx)
+    r = _scan(DIR_LONG, h, l, o, c, atr, is_ttr, ctx, allow_rev)
+    if r is not None:
+        return r
+    return _scan(DIR_SHORT, h, l, o, c, atr, is_ttr, ctx, allow_rev)
 
-    # 7. TRBreakout (仅 TradingRange)
-    if ENABLE_TR_BREAKOUT and ctx.mstate.state == MarketState.TRADING_RANGE:
-        r = _match(check_tr_breakout(h, l, o, c, atr, ctx))
-        if r:
-            return r
 
-    allow_rev = (
+def _allow_reversal(ctx: SignalContext) -> bool:
+    return (
         ctx.mstate.state in REVERSAL_ALLOWED_STATES
         or ctx.mstate.cycle == MarketCycle.SPIKE
     )
 
-    # 8. Climax
-    if ENABLE_CLIMAX:
-        r = _match(check_climax(h, l, o, c, atr, ctx))
-        if r:
-            return r
-
-    # 9. Wedge (允许反转)
-    if ENABLE_WEDGE and allow_rev:
-        r = check_wedge(h, l, o, c, atr, direction, ctx)
-        if r:
-            return r
-
-    # 10. MTR (允许反转)
-    if ENABLE_MTR and allow_rev:
-        r = _match(check_mtr(h, l, o, c, atr, ctx))
-        if r:
-            return r
-
-    # 11. FailedBreakout (仅 TradingRange)
-    if ENABLE_FAILED_BO and ctx.mstate.state == MarketState.TRADING_RANGE:
-        r = _match(check_failed_breakout(h, l, o, c, atr, ctx))
-        if r:
-            return r
-
-    # 12. DoubleTopBottom (允许反转)
-    if ENABLE_DTDB and allow_rev:
-        r = check_double_top_bottom(h, l, o, c, atr, direction, ctx)
-        if r:
-            return r
-
-    # 13. OutsideBar (允许反转)
-    if ENABLE_OUTSIDE_BAR and allow_rev:
-        r = _match(check_outside_bar(h, l, o, c, atr, ctx))
-        if r:
-            return r
-
-    # 14. ReversalBar (允许反转)
-    if ENABLE_REV_BAR and allow_rev:
-        r = _match(check_reversal_bar(h, l, o, c, atr, ctx))
-        if r:
-            return r
-
-    # 15. IIPattern (允许反转)
-    if ENABLE_II_PATTERN and allow_rev:
-        r = _match(check_ii_pattern(h, l, o, c, atr, ctx))
-        if r:
-            return r
-
-    # 16. MeasuredMove
-    if ENABLE_MEASURED_MOVE:
-        r = _match(check_measured_move(h, l, o, c, atr, ctx))
-        if r:
-            return r
-
-    # 17. FinalFlag (仅 FinalFlag)
-    if ctx.mstate.state == MarketState.FINAL_FLAG:
-        r = _match(check_final_flag(h, l, o, c, atr, ctx))
-        if r:
-            return r
 
+def _scan(
+    direction: int,
+    h, l, o, c,
+    atr: float,
+    is_ttr: bool,
+    ctx: SignalContext,
+    allow_rev: bool,
+) -> Optional[SignalResult]:
+    state = ctx.mstate.state
+    gates = (
+        True,                                  # _G_ALWAYS
+        not is_ttr,                            # _G_NOT_TTR
+        state == MarketState.TRADING_RANGE,    # _G_TR
+        allow_rev,                             # _G_REV
+        state == MarketState.FINAL_FLAG,       # _G_FINAL_FLAG
+    )
+    for fn, directional, gate in _SCAN_PLAN:
+        if not gates[gate]:
+            continue
+        if directional:
+            r = fn(h, l, o, c, atr, direction, ctx)
+            if r is not None:
+                return r
+        else:
+            # 检测结果自带 direction（与 signal_type 的 BUY/SELL 一致），整数比较即可
+            r = fn(h, l, o, c, atr, ctx)
+            if r is not None and r.direction == direction:
+                return r
     return None
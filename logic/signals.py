@@ -10,14 +10,16 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Optional
 
-import pandas as pd
+import numpy as np
 
 from logic.constants import (
     SignalType, SignalResult, AlwaysIn, MarketState, MarketCycle,
     DIR_LONG, DIR_SHORT,
     MIN_SPIKE_BARS, SPIKE_OVERLAP_MAX, SPIKE_CLIMAX_ATR_MULT,
     MAX_STOP_ATR_MULT, NEAR_TRENDLINE_ATR_MULT, REQUIRE_SECOND_ENTRY,
+    STRONG_STOP_STATES,
 )
+from logic.jit import njit
 from logic.swing_tracker import SwingTracker
 from logic.hl_counter import HLCounter
 from logic.market_state import MarketStateTracker
@@ -26,7 +28,7 @@ from logic.filters import (
 )
 
 
-@dataclass
+@dataclass(slots=True)
 class SignalContext:
     """检测函数所需的只读上下文引用"""
     swings: SwingTracker
@@ -60,60 +62,35 @@ def _b(arr, bar: int):
 def _validate_and_cool(side: str, h, l, o, c, atr: float, ctx: SignalContext) -> bool:
     return (
         validate_signal_bar(_b(h, 1), _b(l, 1), _b(o, 1), _b(c, 1), side)
-        and ctx.cooldown.check(side, _b(c, 1), atr,
-                               pd.Series(h), pd.Series(l))
+        and ctx.cooldown.check(side, _b(c, 1), atr, h, l)
     )
 
 
 # ── 1. Spike ──────────────────────────────────────────────────────
 
-def _count_spike_bull(h, l, o, c, atr: float, n: int) -> int:
+@njit(cache=True)
+def _count_spike(h, l, o, c, atr: float, n: int, is_bull: bool, overlap_max: float) -> int:
+    """从 bar[2] 向前数连续同向趋势棒（重叠过大即中断）。多空共用一个内核。"""
     count = 0
     mx = min(20, n - 2)
     for i in range(2, mx + 1):
-        idx = -1 - i
-        body = c[idx] - o[idx]
-        rng = h[idx] - l[idx]
-        if rng <= 0:
-            break
-        trend = body > 0 and body / rng > 0.50
-        if not trend:
-            cp = (c[idx] - l[idx]) / rng
-            trend = cp > 0.6 and rng > atr * 0.5
-        if not trend:
-            break
-        if i > 2:
-            prev = idx + 1
-            prev_mid = (h[prev] + l[prev]) / 2.0
-            overlap = prev_mid - l[idx]
-            prev_rng = h[prev] - l[prev]
-            if prev_rng > 0 and overlap / prev_rng > SPIKE_OVERLAP_MAX:
-                break
-        count += 1
-    return count
-
-
-def _count_spike_bear(h, l, o, c, atr: float, n: int) -> int:
-    count = 0
-    mx = min(20, n - 2)
-    for i in range(2, mx + 1):
-        idx = -1 - i
-        body = o[idx] - c[idx]
+        idx = n - 1 - i
         rng = h[idx] - l[idx]
         if rng <= 0:
             break
+        body = (c[idx] - o[idx]) if is_bull else (o[idx] - c[idx])
         trend = body > 0 and body / rng > 0.50
         if not trend:
-            cp = (h[idx] - c[idx]) / rng
+            cp = ((c[idx] - l[idx]) if is_bull else (h[idx] - c[idx])) / rng
             trend = cp > 0.6 and rng > atr * 0.5
         if not trend:
             break
         if i > 2:
             prev = idx + 1
             prev_mid = (h[prev] + l[prev]) / 2.0
-            overlap = h[idx] - prev_mid
+            overlap = (prev_mid - l[idx]) if is_bull else (h[idx] - prev_mid)
             prev_rng = h[prev] - l[prev]
-            if prev_rng > 0 and overlap / prev_rng > SPIKE_OVERLAP_MAX:
+            if prev_rng > 0 and overlap / prev_rng > overlap_max:
                 break
         count += 1
     return count
@@ -125,15 +102,12 @@ def check_spike(h, l, o, c, atr: float, ctx: SignalContext) -> Optional[SignalRe
         return None
     ai = ctx.mstate.always_in
 
-    bull = _count_spike_bull(h, l, o, c, atr, n)
+    bull = _count_spike(h, l, o, c, atr, n, True, SPIKE_OVERLAP_MAX)
     if bull >= MIN_SPIKE_BARS:
         if ai == AlwaysIn.SHORT and bull < 5:
             pass
         elif _validate_and_cool("buy", h, l, o, c, atr, ctx) and c[-2] > o[-2]:
-            bot = l[-2]
-            for i in range(1, bull + 2):
-                if -1 - i >= -n and l[-1 - i] < bot:
-                    bot = l[-1 - i]
+            bot = l[-(bull + 2):-1].min()
             sl = bot - atr * 0.3
             if c[-2] - sl > atr * MAX_STOP_ATR_MULT:
                 rsl = ctx.swings.get_recent_swing_low(1)
@@ -144,15 +118,12 @@ def check_spike(h, l, o, c, atr: float, ctx: SignalContext) -> Optional[SignalRe
             ctx.cooldown.record("buy", c[-2])
             return SignalResult(SignalType.SPIKE_BUY, DIR_LONG, float(c[-2]), sl, reason="Spike")
 
-    bear = _count_spike_bear(h, l, o, c, atr, n)
+    bear = _count_spike(h, l, o, c, atr, n, False, SPIKE_OVERLAP_MAX)
     if bear >= MIN_SPIKE_BARS:
         if ai == AlwaysIn.LONG and bear < 5:
             return None
         if _validate_and_cool("sell", h, l, o, c, atr, ctx) and c[-2] < o[-2]:
-            top = h[-2]
-            for i in range(1, bear + 2):
-                if -1 - i >= -n and h[-1 - i] > top:
-                    top = h[-1 - i]
+            top = h[-(bear + 2):-1].max()
             sl = top + atr * 0.3
             if sl - c[-2] > atr * MAX_STOP_ATR_MULT:
                 rsh = ctx.swings.get_recent_swing_high(1)
@@ -187,10 +158,7 @@ def check_micro_channel(h, l, o, c, atr: float, ctx: SignalContext) -> Optional[
     if up >= 5 and ai == AlwaysIn.LONG:
         if h[-2] > h[-3] and c[-2] > o[-2]:
             if _validate_and_cool("buy", h, l, o, c, atr, ctx):
-                mc_low = l[-3]
-                for i in range(2, up + 2):
-                    if -1 - i >= -n and l[-1 - i] < mc_low:
-                        mc_low = l[-1 - i]
+                mc_low = l[-(up + 2):-2].min()
                 sl = mc_low - atr * 0.3
                 if c[-2] - sl > atr * MAX_STOP_ATR_MULT:
                     sl = min(l[-2], l[-3]) - atr * 0.3
@@ -213,10 +181,7 @@ def check_micro_channel(h, l, o, c, atr: float, ctx: SignalContext) -> Optional[
     if dn >= 5 and ai == AlwaysIn.SHORT:
         if l[-2] < l[-3] and c[-2] < o[-2]:
             if _validate_and_cool("sell", h, l, o, c, atr, ctx):
-                mc_high = h[-3]
-                for i in range(2, dn + 2):
-                    if -1 - i >= -n and h[-1 - i] > mc_high:
-                        mc_high = h[-1 - i]
+                mc_high = h[-(dn + 2):-2].max()
                 sl = mc_high + atr * 0.3
                 if sl - c[-2] > atr * MAX_STOP_ATR_MULT:
                     sl = max(h[-2], h[-3]) + atr * 0.3
@@ -267,7 +232,7 @@ def check_hl_count(h, l, o, c, atr: float, direction: int, ctx: SignalContext) -
     elif count < 2:
         return None
 
-    if not ctx.cooldown.check(side, c[-2], atr, pd.Series(h), pd.Series(l)):
+    if not ctx.cooldown.check(side, c[-2], atr, h, l):
         return None
     if not validate_signal_bar(h[-2], l[-2], o[-2], c[-2], side):
         return None
@@ -323,7 +288,7 @@ def check_trend_bar(h, l, o, c, atr: float, ctx: SignalContext) -> Optional[Sign
         return None
     if c[-2] > o[-2] and ctx.mstate.always_in == AlwaysIn.LONG:
         cp = (c[-2] - l[-2]) / rng
-        if cp >= 0.75 and ctx.cooldown.check("buy", c[-2], atr, pd.Series(h), pd.Series(l)):
+        if cp >= 0.75 and ctx.cooldown.check("buy", c[-2], atr, h, l):
             sl = l[-2] - atr * 0.3
             if c[-2] - sl > atr * MAX_STOP_ATR_MULT:
                 return None
@@ -331,7 +296,7 @@ def check_trend_bar(h, l, o, c, atr: float, ctx: SignalContext) -> Optional[Sign
             return SignalResult(SignalType.TREND_BAR_BUY, DIR_LONG, float(c[-2]), sl, reason="TrendBar")
     if c[-2] < o[-2] and ctx.mstate.always_in == AlwaysIn.SHORT:
         cp = (h[-2] - c[-2]) / rng
-        if cp >= 0.75 and ctx.cooldown.check("sell", c[-2], atr, pd.Series(h), pd.Series(l)):
+        if cp >= 0.75 and ctx.cooldown.check("sell", c[-2], atr, h, l):
             sl = h[-2] + atr * 0.3
             if sl - c[-2] > atr * MAX_STOP_ATR_MULT:
                 return None
@@ -352,25 +317,19 @@ def check_reversal_bar(h, l, o, c, atr: float, ctx: SignalContext) -> Optional[S
     body = abs(c[-2] - o[-2])
     ut = h[-2] - max(c[-2], o[-2])
     lt = min(c[-2], o[-2]) - l[-2]
-    lb_low = l[-2]
-    lb_high = h[-2]
-    for i in range(2, min(11, n)):
-        if l[-1 - i] < lb_low:
-            lb_low = l[-1 - i]
-        if h[-1 - i] > lb_high:
-            lb_high = h[-1 - i]
 
+    # bar[1..10] 极值按需切片求取（n >= 11 已保证窗口完整）
     if lt > rng * 0.4 and c[-2] > o[-2] and lt > body:
-        drop = h[-2] - lb_low
-        if drop >= atr * 1.5 and ctx.cooldown.check("buy", c[-2], atr, pd.Series(h), pd.Series(l)):
+        drop = h[-2] - l[-11:-1].min()
+        if drop >= atr * 1.5 and ctx.cooldown.check("buy", c[-2], atr, h, l):
             sl = l[-2] - atr * 0.3
             if c[-2] - sl > atr * MAX_STOP_ATR_MULT:
                 return None
             ctx.cooldown.record("buy", c[-2])
             return SignalResult(SignalType.REV_BAR_BUY, DIR_LONG, float(c[-2]), sl, reason="RevBar")
     if ut > rng * 0.4 and c[-2] < o[-2] and ut > body:
-        rise = lb_high - l[-2]
-        if rise >= atr * 1.5 and ctx.cooldown.check("sell", c[-2], atr, pd.Series(h), pd.Series(l)):
+        rise = h[-11:-1].max() - l[-2]
+        if rise >= atr * 1.5 and ctx.cooldown.check("sell", c[-2], atr, h, l):
             sl = h[-2] + atr * 0.3
             if sl - c[-2] > atr * MAX_STOP_ATR_MULT:
                 return None
@@ -403,13 +362,13 @@ def check_ii_pattern(h, l, o, c, atr: float, ctx: SignalContext) -> Optional[Sig
             break
     if inside < 2:
         return None
-    if h[-2] > p_h and c[-2] > o[-2] and ctx.cooldown.check("buy", c[-2], atr, pd.Series(h), pd.Series(l)):
+    if h[-2] > p_h and c[-2] > o[-2] and ctx.cooldown.check("buy", c[-2], atr, h, l):
         sl = p_l - atr * 0.3
         if c[-2] - sl > atr * MAX_STOP_ATR_MULT:
             return None
         ctx.cooldown.record("buy", c[-2])
         return SignalResult(SignalType.II_BUY, DIR_LONG, float(c[-2]), sl, reason="ii")
-    if l[-2] < p_l and c[-2] < o[-2] and ctx.cooldown.check("sell", c[-2], atr, pd.Series(h), pd.Series(l)):
+    if l[-2] < p_l and c[-2] < o[-2] and ctx.cooldown.check("sell", c[-2], atr, h, l):
         sl = p_h + atr * 0.3
         if sl - c[-2] > atr * MAX_STOP_ATR_MULT:
             return None
@@ -432,24 +391,19 @@ def check_outside_bar(h, l, o, c, atr: float, ctx: SignalContext) -> Optional[Si
     body = abs(c[-2] - o[-2])
     if body / rng < 0.40:
         return None
-    lb_low = l[-2]
-    lb_high = h[-2]
-    for i in range(2, min(9, n)):
-        if l[-1 - i] < lb_low:
-            lb_low = l[-1 - i]
-        if h[-1 - i] > lb_high:
-            lb_high = h[-1 - i]
+    # bar[1..8] 极值（n 不足时截断）
+    w = min(9, n)
     if c[-2] > o[-2]:
-        drop = h[-2] - lb_low
-        if drop >= atr * 1.0 and ctx.cooldown.check("buy", c[-2], atr, pd.Series(h), pd.Series(l)):
+        drop = h[-2] - l[-w:-1].min()
+        if drop >= atr * 1.0 and ctx.cooldown.check("buy", c[-2], atr, h, l):
             sl = l[-2] - atr * 0.3
             if c[-2] - sl > atr * MAX_STOP_ATR_MULT:
                 return None
             ctx.cooldown.record("buy", c[-2])
             return SignalResult(SignalType.OUTSIDE_BAR_BUY, DIR_LONG, float(c[-2]), sl, reason="OutsideBar")
     if c[-2] < o[-2]:
-        rise = lb_high - l[-2]
-        if rise >= atr * 1.0 and ctx.cooldown.check("sell", c[-2], atr, pd.Series(h), pd.Series(l)):
+        rise = h[-w:-1].max() - l[-2]
+        if rise >= atr * 1.0 and ctx.cooldown.check("sell", c[-2], atr, h, l):
             sl = h[-2] + atr * 0.3
             if sl - c[-2] > atr * MAX_STOP_ATR_MULT:
                 return None
@@ -474,7 +428,7 @@ def check_measured_move(h, l, o, c, atr: float, ctx: SignalContext) -> Optional[
         leg = sh2 - sl2
         target = sl1 + leg
         if h[-2] >= target - tol and h[-2] <= target + tol:
-            if c[-2] < o[-2] and ctx.cooldown.check("sell", c[-2], atr, pd.Series(h), pd.Series(l)):
+            if c[-2] < o[-2] and ctx.cooldown.check("sell", c[-2], atr, h, l):
                 sl = h[-2] + atr * 0.3
                 if sl - c[-2] > atr * MAX_STOP_ATR_MULT:
                     return None
@@ -484,7 +438,7 @@ def check_measured_move(h, l, o, c, atr: float, ctx: SignalContext) -> Optional[
         leg = sh2 - sl2
         target = sh1 - leg
         if l[-2] <= target + tol and l[-2] >= target - tol:
-            if c[-2] > o[-2] and ctx.cooldown.check("buy", c[-2], atr, pd.Series(h), pd.Series(l)):
+            if c[-2] > o[-2] and ctx.cooldown.check("buy", c[-2], atr, h, l):
                 sl = l[-2] - atr * 0.3
                 if c[-2] - sl > atr * MAX_STOP_ATR_MULT:
                     return None
@@ -547,7 +501,7 @@ def check_breakout_pullback(h, l, o, c, atr: float, ctx: SignalContext) -> Optio
     tol = atr * 0.5
     if ctx.breakout_dir == "up":
         if l[-2] <= ctx.breakout_level + tol and c[-2] > o[-2] and c[-2] > ctx.breakout_level:
-            if ctx.cooldown.check("buy", c[-2], atr, pd.Series(h), pd.Series(l)):
+            if ctx.cooldown.check("buy", c[-2], atr, h, l):
                 sl = min(l[-2], ctx.breakout_level) - atr * 0.3
                 if c[-2] - sl > atr * MAX_STOP_ATR_MULT:
                     return None
@@ -556,7 +510,7 @@ def check_breakout_pullback(h, l, o, c, atr: float, ctx: SignalContext) -> Optio
                 return SignalResult(SignalType.BO_PULLBACK_BUY, DIR_LONG, float(c[-2]), sl, reason="BOPullback")
     if ctx.breakout_dir == "down":
         if h[-2] >= ctx.breakout_level - tol and c[-2] < o[-2] and c[-2] < ctx.breakout_level:
-            if ctx.cooldown.check("sell", c[-2], atr, pd.Series(h), pd.Series(l)):
+            if ctx.cooldown.check("sell", c[-2], atr, h, l):
                 sl = max(h[-2], ctx.breakout_level) + atr * 0.3
                 if sl - c[-2] > atr * MAX_STOP_ATR_MULT:
                     return None
@@ -568,68 +522,84 @@ def check_breakout_pullback(h, l, o, c, atr: float, ctx: SignalContext) -> Optio
 
 # ── 12. Wedge ─────────────────────────────────────────────────────
 
-def check_wedge(h, l, o, c, atr: float, direction: int, ctx: SignalContext) -> Optional[SignalResult]:
+def _wedge_local_extremes(h, l, direction: int, lookback: int) -> np.ndarray:
+    """
+    bar[3..lookback] 中严格低于 (多) / 高于 (空) 左右各 2 根的局部极值，
+    按 bar 序号由近及远返回。lookback <= n - 3 保证两侧邻棒都在范围内。
+    """
     n = len(h)
-    if atr <= 0 or n < 10:
-        return None
-    lookback = min(40, n - 3)
-    ext = []
-    ext_bars = []
-    ext_bodies = []
-    for i in range(3, lookback + 1):
-        idx = -1 - i
-        if -idx - 2 > n or -idx + 2 > n:
-            continue
-        ei = l[idx] if direction == DIR_LONG else h[idx]
-        e1 = l[idx + 1] if direction == DIR_LONG else h[idx + 1]
-        e2 = l[idx + 2] if direction == DIR_LONG else h[idx + 2]
-        e3 = l[idx - 1] if direction == DIR_LONG else h[idx - 1]
-        e4 = l[idx - 2] if direction == DIR_LONG else h[idx - 2]
-        is_local = (ei < e1 and ei < e2 and ei < e3 and ei < e4) if direction == DIR_LONG else (ei > e1 and ei > e2 and ei > e3 and ei > e4)
-        if not is_local:
-            continue
-        seq = len(ext) == 0 or (ei < ext[-1] if direction == DIR_LONG else ei > ext[-1])
-        if not seq:
-            continue
-        has_retrace = True
-        if ext:
-            prev_bar_idx = ext_bars[-1]
-            opp = h[idx] if direction == DIR_LONG else l[idx]
-            for j_off in range(prev_bar_idx + 1, i):
-                jdx = -1 - j_off
-                if -jdx > n:
-                    break
-                if direction == DIR_LONG and h[jdx] > opp:
-                    opp = h[jdx]
-                if direction == DIR_SHORT and l[jdx] < opp:
-                    opp = l[jdx]
-            retrace = (opp - ext[-1]) if direction == DIR_LONG else (ext[-1] - opp)
+    lo = n - 1 - lookback  # bar[lookback]
+    hi = n - 3             # bar[3] 的下一位（切片右端）
+    if hi <= lo:
+        return np.empty(0, np.int64)
+    # 四个邻棒比较手工展开，原地 &= 累积，不产生额外临时数组
+    if direction == DIR_LONG:
+        mid = l[lo:hi]
+        mask = mid < l[lo - 2:hi - 2]
+        mask &= mid < l[lo - 1:hi - 1]
+        mask &= mid < l[lo + 1:hi + 1]
+        mask &= mid < l[lo + 2:hi + 2]
+    else:
+        mid = h[lo:hi]
+        mask = mid > h[lo - 2:hi - 2]
+        mask &= mid > h[lo - 1:hi - 1]
+        mask &= mid > h[lo + 1:hi + 1]
+        mask &= mid > h[lo + 2:hi + 2]
+    # 数组位置 p 对应 bar[n - 1 - p]
+    return (n - 1 - lo - np.flatnonzero(mask))[::-1]
+
+
+@njit(cache=True)
+def _wedge_pushes(h, l, o, c, atr: float, is_long: bool, cand):
+    """
+    在候选局部极值 cand (bar 序号，由近及远) 中挑出三推：
+    依次更低 (多) / 更高 (空)，且两推之间有 >= 0.3 ATR 的回撤。
+    返回 (推数, 极值价, bar 序号, 动量实体)。
+    """
+    n = len(h)
+    ext = np.zeros(3)
+    bars = np.full(3, -1, np.int64)
+    bodies = np.zeros(3)
+    k = 0
+    for i in cand:
+        p = n - 1 - i
+        ei = l[p] if is_long else h[p]
+        if k > 0:
+            if not ((ei < ext[k - 1]) if is_long else (ei > ext[k - 1])):
+                continue
+            # bar[i]（含）至上一推（不含）之间的反向极值
+            opp = h[p] if is_long else l[p]
+            for q in range(p + 1, n - 1 - bars[k - 1]):
+                if is_long:
+                    if h[q] > opp:
+                        opp = h[q]
+                elif l[q] < opp:
+                    opp = l[q]
+            retrace = (opp - ext[k - 1]) if is_long else (ext[k - 1] - opp)
             if retrace < atr * 0.3:
-                has_retrace = False
-        if not has_retrace:
-            continue
+                continue
+        # EA: startJ = 上一推 (< i) 时区间为空，只有第一推会扫描实体
         max_body = 0.0
-        start_j = ext_bars[-1] if ext_bars else min(i + 5, n - 1)
-        for j_off in range(i, start_j + 1):
-            jdx = -1 - j_off
-            if -jdx > n:
-                break
-            b = (o[jdx] - c[jdx]) if direction == DIR_LONG else (c[jdx] - o[jdx])
-            if b > max_body:
-                max_body = b
-        ext.append(ei)
-        ext_bars.append(i)
-        ext_bodies.append(max_body)
-        if len(ext) >= 3:
+        if k == 0:
+            for j in range(i, min(i + 5, n - 1) + 1):
+                q = n - 1 - j
+                b = (o[q] - c[q]) if is_long else (c[q] - o[q])
+                if b > max_body:
+                    max_body = b
+        ext[k] = ei
+        bars[k] = i
+        bodies[k] = max_body
+        k += 1
+        if k >= 3:
             break
+    return k, ext, bars, bodies
 
-    if len(ext) < 3:
-        return None
-    if not (ext_bodies[0] > ext_bodies[1] and ext_bodies[1] > ext_bodies[2]):
-        return None
-    curr_ext = l[-2] if direction == DIR_LONG else h[-2]
-    if abs(curr_ext - ext[2]) > atr * NEAR_TRENDLINE_ATR_MULT:
+
+def check_wedge(h, l, o, c, atr: float, direction: int, ctx: SignalContext) -> Optional[SignalResult]:
+    n = len(h)
+    if atr <= 0 or n < 10:
         return None
+    # 信号棒形态只看 bar[1]，先于三推扫描判断，不满足直接返回
     rng = h[-2] - l[-2]
     if rng <= 0:
         return None
@@ -637,8 +607,20 @@ def check_wedge(h, l, o, c, atr: float, direction: int, ctx: SignalContext) -> O
     cp = ((c[-2] - l[-2]) / rng) if direction == DIR_LONG else ((h[-2] - c[-2]) / rng)
     if not bar_dir or cp < 0.50:
         return None
+    lookback = min(40, n - 3)
+    pushes, ext, _, ext_bodies = _wedge_pushes(
+        h, l, o, c, atr, direction == DIR_LONG,
+        _wedge_local_extremes(h, l, direction, lookback),
+    )
+    if pushes < 3:
+        return None
+    if not (ext_bodies[0] > ext_bodies[1] and ext_bodies[1] > ext_bodies[2]):
+        return None
+    curr_ext = l[-2] if direction == DIR_LONG else h[-2]
+    if abs(curr_ext - ext[2]) > atr * NEAR_TRENDLINE_ATR_MULT:
+        return None
     side = "buy" if direction == DIR_LONG else "sell"
-    if not ctx.cooldown.check(side, c[-2], atr, pd.Series(h), pd.Series(l)):
+    if not ctx.cooldown.check(side, c[-2], atr, h, l):
         return None
     sl = ext[2] - direction * atr * 0.5
     ctx.cooldown.record(side, c[-2])
@@ -670,14 +652,11 @@ def check_climax(h, l, o, c, atr: float, ctx: SignalContext) -> Optional[SignalR
             if c_rng > 0 and lt / c_rng > 0.25:
                 pass
             else:
-                lb_low = l[-4] if n > 4 else l[-3]
-                for i in range(3, min(11, n)):
-                    if l[-1 - i] < lb_low:
-                        lb_low = l[-1 - i]
-                prior = h[-3] - lb_low
+                # bar[3..10] 最低（n >= 12 已保证窗口完整）
+                prior = h[-3] - l[-11:-3].min()
                 min_prior = atr * 4.0 if strict else atr * 2.0
                 if prior >= min_prior:
-                    if ctx.cooldown.check("sell", c[-2], atr, pd.Series(h), pd.Series(l)):
+                    if ctx.cooldown.check("sell", c[-2], atr, h, l):
                         sl = _calc_sl_sell(h, l, atr, ctx)
                         if sl > 0:
                             ctx.cooldown.record("sell", c[-2])
@@ -690,14 +669,10 @@ def check_climax(h, l, o, c, atr: float, ctx: SignalContext) -> Optional[SignalR
             if c_rng > 0 and ut / c_rng > 0.25:
                 pass
             else:
-                lb_high = h[-4] if n > 4 else h[-3]
-                for i in range(3, min(11, n)):
-                    if h[-1 - i] > lb_high:
-                        lb_high = h[-1 - i]
-                prior = lb_high - l[-3]
+                prior = h[-11:-3].max() - l[-3]
                 min_prior = atr * 4.0 if strict else atr * 2.0
                 if prior >= min_prior:
-                    if ctx.cooldown.check("buy", c[-2], atr, pd.Series(h), pd.Series(l)):
+                    if ctx.cooldown.check("buy", c[-2], atr, h, l):
                         sl = _calc_sl_buy(h, l, atr, ctx)
                         if sl > 0:
                             ctx.cooldown.record("buy", c[-2])
@@ -707,7 +682,7 @@ def check_climax(h, l, o, c, atr: float, ctx: SignalContext) -> Optional[SignalR
 
 def _calc_sl_buy(h, l, atr, ctx):
     """CalculateUnifiedStopLoss 简化版 — buy"""
-    strong = ctx.mstate.state in (MarketState.STRONG_TREND, MarketState.BREAKOUT, MarketState.TIGHT_CHANNEL)
+    strong = ctx.mstate.state in STRONG_STOP_STATES
     buf = (atr * 0.3 if strong else atr * 0.5)
     buf = max(buf, atr * 0.2)
     if strong:
@@ -723,7 +698,7 @@ def _calc_sl_buy(h, l, atr, ctx):
 
 
 def _calc_sl_sell(h, l, atr, ctx):
-    strong = ctx.mstate.state in (MarketState.STRONG_TREND, MarketState.BREAKOUT, MarketState.TIGHT_CHANNEL)
+    strong = ctx.mstate.state in STRONG_STOP_STATES
     buf = (atr * 0.3 if strong else atr * 0.5)
     buf = max(buf, atr * 0.2)
     if strong:
@@ -790,7 +765,7 @@ def check_failed_breakout(h, l, o, c, atr: float, ctx: SignalContext) -> Optiona
     # 向上突破失败 → sell
     if h[-2] > ms.tr_high and c[-2] < ms.tr_high and c[-2] < o[-2]:
         cp = (h[-2] - c[-2]) / rng
-        if cp >= 0.60 and ctx.cooldown.check("sell", c[-2], atr, pd.Series(h), pd.Series(l)):
+        if cp >= 0.60 and ctx.cooldown.check("sell", c[-2], atr, h, l):
             sl = h[-2] + atr * 0.3
             if sl - c[-2] > atr * MAX_STOP_ATR_MULT:
                 return None
@@ -799,7 +774,7 @@ def check_failed_breakout(h, l, o, c, atr: float, ctx: SignalContext) -> Optiona
     # 向下突破失败 → buy
     if l[-2] < ms.tr_low and c[-2] > ms.tr_low and c[-2] > o[-2]:
         cp = (c[-2] - l[-2]) / rng
-        if cp >= 0.60 and ctx.cooldown.check("buy", c[-2], atr, pd.Series(h), pd.Series(l)):
+        if cp >= 0.60 and ctx.cooldown.check("buy", c[-2], atr, h, l):
             sl = l[-2] - atr * 0.3
             if c[-2] - sl > atr * MAX_STOP_ATR_MULT:
                 return None
@@ -830,7 +805,7 @@ def check_double_top_bottom(h, l, o, c, atr: float, direction: int, ctx: SignalC
     if not level_ok or not bar_dir or cp < 0.55:
         return None
     side = "buy" if direction == DIR_LONG else "sell"
-    if not ctx.cooldown.check(side, c[-2], atr, pd.Series(h), pd.Series(l)):
+    if not ctx.cooldown.check(side, c[-2], atr, h, l):
         return None
     sl = (min(lv1, lv2) - atr * 0.3) if direction == DIR_LONG else (max(lv1, lv2) + atr * 0.3)
     risk = (c[-2] - sl) if direction == DIR_LONG else (sl - c[-2])
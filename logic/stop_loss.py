@@ -7,104 +7,156 @@
 """
 from __future__ import annotations
 
+import math
+
 from logic.constants import (
-    MarketState, MAX_STOP_ATR_MULT, MIN_BUFFER_ATR_MULT,
+    MarketState, MAX_STOP_ATR_MULT, MIN_BUFFER_ATR_MULT, STRONG_STOP_STATES,
     SOFT_STOP_CONFIRM_MODE, SOFT_STOP_CONFIRM_BARS,
 )
+from logic.jit import njit
 from logic.swing_tracker import SwingTracker
 
 
-def get_brooks_stop_loss(
-    side: str,
+@njit(cache=True)
+def _brooks_sl(
+    side_is_buy: bool,
     entry: float,
     atr: float,
-    swings: SwingTracker,
+    sw: float,
     h1: float, l1: float, h2: float, l2: float,
-    spread: float = 0.0,
+    spread: float,
+    max_mult: float,
+    min_buf_mult: float,
 ) -> float:
-    buf = (atr * 0.3 if atr > 0 else 0) + spread
-    min_buf = atr * MIN_BUFFER_ATR_MULT if atr > 0 else 0
+    """GetBrooksStopLoss 纯数值内核（sw 为已查询的最近 swing）。"""
+    atr_pos = atr > 0
+    atr_03 = atr * 0.3 if atr_pos else 0.0
+    # atr<=0 时不做距离上限：用 inf 让所有 "> 上限" 判断自然失败
+    atr_max = atr * max_mult if atr_pos else math.inf
+    buf = atr_03 + spread
+    min_buf = atr * min_buf_mult if atr_pos else 0.0
     if buf < min_buf:
         buf = min_buf
+    fallback_buf = atr_03 if atr_pos else buf
 
-    if side == "buy":
-        sw = swings.get_recent_swing_low(1, allow_temp=True)
-        if sw > 0 and sw < entry:
-            dist = entry - sw
-            if atr <= 0 or dist <= atr * MAX_STOP_ATR_MULT:
-                return sw - buf
-        bar_low = min(l1, l2) if l2 > 0 else l1
+    if side_is_buy:
+        if sw > 0 and sw < entry and entry - sw <= atr_max:
+            return sw - buf
+        bar_low = l1 if l2 <= 0 else min(l1, l2)
         if bar_low <= 0:
             return 0.0
         sl = bar_low - buf
         if sl >= entry:
-            sl = entry - (atr * 0.3 if atr > 0 else buf)
-        if atr > 0 and (entry - sl) > atr * MAX_STOP_ATR_MULT:
-            sl = entry - atr * MAX_STOP_ATR_MULT
+            sl = entry - fallback_buf
+        if entry - sl > atr_max:
+            sl = entry - atr_max
         return sl
     else:
-        sw = swings.get_recent_swing_high(1, allow_temp=True)
-        if sw > 0 and sw > entry:
-            dist = sw - entry
-            if atr <= 0 or dist <= atr * MAX_STOP_ATR_MULT:
-                return sw + buf
-        bar_high = max(h1, h2) if h2 > 0 else h1
+        if sw > 0 and sw > entry and sw - entry <= atr_max:
+            return sw + buf
+        bar_high = h1 if h2 <= 0 else max(h1, h2)
         if bar_high <= 0:
             return 0.0
         sl = bar_high + buf
         if sl <= entry:
-            sl = entry + (atr * 0.3 if atr > 0 else buf)
-        if atr > 0 and (sl - entry) > atr * MAX_STOP_ATR_MULT:
-            sl = entry + atr * MAX_STOP_ATR_MULT
+            sl = entry + fallback_buf
+        if sl - entry > atr_max:
+            sl = entry + atr_max
         return sl
 
 
-def calculate_unified_stop_loss(
-    side: str,
-    atr: float,
+@njit(cache=True)
+def _unified_sl(
+    side_is_buy: bool,
+    is_strong: bool,
     entry: float,
-    market_state: MarketState,
-    swings: SwingTracker,
+    atr: float,
+    sw: float,
     h1: float, l1: float, h2: float, l2: float,
-    spread: float = 0.0,
+    spread: float,
+    max_mult: float,
+    min_buf_mult: float,
 ) -> float:
-    is_strong = market_state in (
-        MarketState.STRONG_TREND,
-        MarketState.BREAKOUT,
-        MarketState.TIGHT_CHANNEL,
-    )
-    atr_buf = (atr * 0.3 if is_strong else atr * 0.5) if atr > 0 else 0
-    min_buf = atr * MIN_BUFFER_ATR_MULT if atr > 0 else 0
+    """CalculateUnifiedStopLoss 纯数值内核；强趋势为常见路径，放在最前。"""
+    atr_pos = atr > 0
+    # EA 原样：swing 距离判断不区分 atr<=0，最终检查才区分
+    atr_lim = atr * max_mult
+    if atr_pos:
+        atr_buf = atr * 0.3 if is_strong else atr * 0.5
+        min_buf = atr * min_buf_mult
+    else:
+        atr_buf = 0.0
+        min_buf = 0.0
     total_buf = max(atr_buf, min_buf) + spread
 
     if is_strong:
-        if side == "buy":
+        if side_is_buy:
             sl = min(l1, l2) - total_buf
             dist = entry - sl
         else:
             sl = max(h1, h2) + total_buf
             dist = sl - entry
+    elif side_is_buy:
+        if sw > 0 and (entry - sw - total_buf) <= atr_lim:
+            sl = sw - total_buf
+        else:
+            sl = min(l1, l2) - total_buf
+        dist = entry - sl
     else:
-        if side == "buy":
-            sw = swings.get_recent_swing_low(1, allow_temp=True)
-            if sw > 0 and (entry - sw - total_buf) <= atr * MAX_STOP_ATR_MULT:
-                sl = sw - total_buf
-            else:
-                sl = min(l1, l2) - total_buf
-            dist = entry - sl
+        if sw > 0 and (sw + total_buf - entry) <= atr_lim:
+            sl = sw + total_buf
         else:
-            sw = swings.get_recent_swing_high(1, allow_temp=True)
-            if sw > 0 and (sw + total_buf - entry) <= atr * MAX_STOP_ATR_MULT:
-                sl = sw + total_buf
-            else:
-                sl = max(h1, h2) + total_buf
-            dist = sl - entry
+            sl = max(h1, h2) + total_buf
+        dist = sl - entry
 
-    if atr > 0 and dist > atr * MAX_STOP_ATR_MULT:
+    if atr_pos and dist > atr_lim:
         return 0.0
     return sl
 
 
+def get_brooks_stop_loss(
+    side: str,
+    entry: float,
+    atr: float,
+    swings: SwingTracker,
+    h1: float, l1: float, h2: float, l2: float,
+    spread: float = 0.0,
+) -> float:
+    is_buy = side == "buy"
+    if is_buy:
+        sw = swings.get_recent_swing_low(1, allow_temp=True)
+    else:
+        sw = swings.get_recent_swing_high(1, allow_temp=True)
+    return _brooks_sl(
+        is_buy, entry, atr, sw, h1, l1, h2, l2, spread,
+        MAX_STOP_ATR_MULT, MIN_BUFFER_ATR_MULT,
+    )
+
+
+def calculate_unified_stop_loss(
+    side: str,
+    atr: float,
+    entry: float,
+    market_state: MarketState,
+    swings: SwingTracker,
+    h1: float, l1: float, h2: float, l2: float,
+    spread: float = 0.0,
+) -> float:
+    is_buy = side == "buy"
+    is_strong = market_state in STRONG_STOP_STATES
+    # 强趋势不使用 swing，省去查询
+    sw = 0.0
+    if not is_strong:
+        if is_buy:
+            sw = swings.get_recent_swing_low(1, allow_temp=True)
+        else:
+            sw = swings.get_recent_swing_high(1, allow_temp=True)
+    return _unified_sl(
+        is_buy, is_strong, entry, atr, sw, h1, l1, h2, l2, spread,
+        MAX_STOP_ATR_MULT, MIN_BUFFER_ATR_MULT,
+    )
+
+
 def check_soft_stop(
     side: str,
     technical_sl: float,
@@ -10,9 +10,11 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 from typing import List, Optional
 
+import numpy as np
 import pandas as pd
 
 from logic.constants import SwingPoint, SWING_CONFIRM_DEPTH
+from logic.jit import njit
 
 MAX_SWING_POINTS = 40
 MAX_M5_SWINGS = 12
@@ -40,10 +42,13 @@ class SwingTracker:
     temp_swing_low_bar: int = -1
 
     # M5 结构跟踪
-    m5_swing_lows: List[float] = field(default_factory=list)
-    m5_swing_highs: List[float] = field(default_factory=list)
-    m5_swing_low_bars: List[int] = field(default_factory=list)
-    m5_swing_high_bars: List[int] = field(default_factory=list)
+    m5_swing_lows: np.ndarray = field(default_factory=lambda: np.empty(0))
+    m5_swing_highs: np.ndarray = field(default_factory=lambda: np.empty(0))
+    m5_swing_low_bars: np.ndarray = field(default_factory=lambda: np.empty(0, np.int64))
+    m5_swing_high_bars: np.ndarray = field(default_factory=lambda: np.empty(0, np.int64))
+
+    # 老化/溢出淘汰后缓存可能过期，下次 _add 时整表重算
+    _cache_stale: bool = field(default=False, repr=False)
 
     # ── 主时间框架更新 ──────────────────────────────────────────────
 
@@ -59,57 +64,42 @@ class SwingTracker:
         # 递增 bar 索引 & 清理
         for sp in self.swings:
             sp.bar_index += 1
-        self.swings = [sp for sp in self.swings if sp.bar_index <= 40]
+        kept = [sp for sp in self.swings if sp.bar_index <= 40]
+        if len(kept) != len(self.swings):
+            self._cache_stale = True
+        self.swings = kept
+
+        h = highs.values
+        l = lows.values
 
         # --- 临时波段 (depth=1) ---
-        # tempBar=2 → iloc[-3] (EA bar[2])
-        if n >= 4:
-            h = highs.values
-            l = lows.values
-            tb = -3  # iloc offset for tempBar
-            if h[-2] < h[tb] and h[-4] < h[tb]:
-                self.temp_swing_high = float(h[tb])
-                self.temp_swing_high_bar = 2
-            if l[-2] > l[tb] and l[-4] > l[tb]:
-                self.temp_swing_low = float(l[tb])
-                self.temp_swing_low_bar = 2
+        # tempBar=2 → iloc[-3] (EA bar[2])；n >= 4 已在入口保证
+        tb = -3  # iloc offset for tempBar
+        if h[-2] < h[tb] and h[-4] < h[tb]:
+            self.temp_swing_high = float(h[tb])
+            self.temp_swing_high_bar = 2
+        if l[-2] > l[tb] and l[-4] > l[tb]:
+            self.temp_swing_low = float(l[tb])
+            self.temp_swing_low_bar = 2
 
         # --- 确认波段 (depth=self.depth) ---
         depth = self.depth
         check_bar = depth + 1  # EA: bar index of candidate
         need = check_bar + depth + 1
+        # n >= need 保证两侧 depth 根均在范围内，循环内无需再做越界判断
         if n < need:
             return
 
-        h = highs.values
-        l = lows.values
-
         # 将 EA 的 bar[checkBar] 映射到 iloc 偏移: -(check_bar+1)
         cb = -(check_bar + 1)
 
-        is_sh = True
+        # 左右各 depth 根邻棒一次切片取极值比较（cb + depth + 1 = -1，不会越到末尾）
         center_h = h[cb]
-        for i in range(1, depth + 1):
-            left = cb + i   # 更近的棒
-            right = cb - i  # 更远的棒
-            if -left > n or -right > n:
-                is_sh = False
-                break
-            if h[left] >= center_h or h[right] >= center_h:
-                is_sh = False
-                break
-
-        is_sl = True
         center_l = l[cb]
-        for i in range(1, depth + 1):
-            left = cb + i
-            right = cb - i
-            if -left > n or -right > n:
-                is_sl = False
-                break
-            if l[left] <= center_l or l[right] <= center_l:
-                is_sl = False
-                break
+        older = slice(cb - depth, cb)
+        newer = slice(cb + 1, cb + depth + 1)
+        is_sh = center_h > h[older].max() and center_h > h[newer].max()
+        is_sl = center_l < l[older].min() and center_l < l[newer].min()
 
         if is_sh:
             self._add(float(center_h), check_bar, True)
@@ -125,40 +115,15 @@ class SwingTracker:
         if n < need:
             return
 
-        h = m5_highs.values
-        l = m5_lows.values
-
-        tmp_lows: list[tuple[float, int]] = []
-        tmp_highs: list[tuple[float, int]] = []
-
-        for cb in range(depth + 1, need - depth - 1):
-            idx = -(cb + 1)
-            # swing low
-            is_sl = True
-            cl = l[idx]
-            for i in range(1, depth + 1):
-                if l[idx + i] <= cl or l[idx - i] <= cl:
-                    is_sl = False
-                    break
-            if is_sl and len(tmp_lows) < MAX_M5_SWINGS:
-                tmp_lows.append((float(cl), cb))
-            # swing high
-            is_sh = True
-            ch = h[idx]
-            for i in range(1, depth + 1):
-                if h[idx + i] >= ch or h[idx - i] >= ch:
-                    is_sh = False
-                    break
-            if is_sh and len(tmp_highs) < MAX_M5_SWINGS:
-                tmp_highs.append((float(ch), cb))
-
-        tmp_lows.sort(key=lambda x: x[1])
-        tmp_highs.sort(key=lambda x: x[1])
-
-        self.m5_swing_lows = [p for p, _ in tmp_lows]
-        self.m5_swing_low_bars = [b for _, b in tmp_lows]
-        self.m5_swing_highs = [p for p, _ in tmp_highs]
-        self.m5_swing_high_bars = [b for _, b in tmp_highs]
+        sl_price, sl_bar, sl_n, sh_price, sh_bar, sh_n = _scan_m5_swings(
+            np.asarray(m5_highs.values, dtype=np.float64),
+            np.asarray(m5_lows.values, dtype=np.float64),
+            depth, need, MAX_M5_SWINGS,
+        )
+        self.m5_swing_lows = sl_price[:sl_n]
+        self.m5_swing_low_bars = sl_bar[:sl_n]
+        self.m5_swing_highs = sh_price[:sh_n]
+        self.m5_swing_high_bars = sh_bar[:sh_n]
 
     # ── 结构跟踪 ──────────────────────────────────────────────────
 
@@ -236,8 +201,18 @@ class SwingTracker:
                 return
         if len(self.swings) >= MAX_SWING_POINTS:
             self.swings.pop()
+            self._cache_stale = True
         self.swings.insert(0, SwingPoint(price=price, bar_index=bar_index, is_high=is_high))
-        self._update_cache()
+        if self._cache_stale:
+            self._update_cache()
+            self._cache_stale = False
+        elif is_high:
+            # 新波段总在 index 0：O(1) 顺移即可
+            self.cached_sh2 = self.cached_sh1
+            self.cached_sh1 = price
+        else:
+            self.cached_sl2 = self.cached_sl1
+            self.cached_sl1 = price
 
     def _update_cache(self) -> None:
         self.cached_sh1 = 0.0
@@ -261,3 +236,45 @@ class SwingTracker:
                 else:
                     self.cached_sl2 = sp.price
                 sl_count += 1
+
+
+@njit(cache=True)
+def _scan_m5_swings(h, l, depth, need, max_n):
+    """
+    M5 波段扫描内核。输出为预分配定长数组 + 计数；
+    cb 单调递增，结果天然按 bar 排序，无需再排序。
+    """
+    sl_price = np.empty(max_n)
+    sl_bar = np.empty(max_n, np.int64)
+    sh_price = np.empty(max_n)
+    sh_bar = np.empty(max_n, np.int64)
+    sl_n = 0
+    sh_n = 0
+    n = len(h)
+    for cb in range(depth + 1, need - depth - 1):
+        idx = n - 1 - cb
+        # swing low
+        if sl_n < max_n:
+            cl = l[idx]
+            is_sl = True
+            for i in range(1, depth + 1):
+                if l[idx + i] <= cl or l[idx - i] <= cl:
+                    is_sl = False
+                    break
+            if is_sl:
+                sl_price[sl_n] = cl
+                sl_bar[sl_n] = cb
+                sl_n += 1
+        # swing high
+        if sh_n < max_n:
+            ch = h[idx]
+            is_sh = True
+            for i in range(1, depth + 1):
+                if h[idx + i] >= ch or h[idx - i] >= ch:
+                    is_sh = False
+                    break
+            if is_sh:
+                sh_price[sh_n] = ch
+                sh_bar[sh_n] = cb
+                sh_n += 1
+    return sl_price, sl_bar, sl_n, sh_price, sh_bar, sh_n
@@ -17,29 +17,29 @@ BrooksQuant 交易系统 - 主入口
 import asyncio
 import logging
 
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 from config import (
+    load_runtime_config,
     load_user_credentials,
+    setup_logging,
+    UserCredentials,
     REDIS_URL,
     DELTA_ENABLED,
-    OBSERVE_BALANCE,
-    POSITION_SIZE_PERCENT,
-    LEVERAGE,
-    SYMBOL as CONFIG_SYMBOL,
-    KLINE_INTERVAL,
-    OBSERVE_MODE,
+    KLINE_QUEUE_MAX,
+    CLOSE_QUEUE_MAX,
+    BSM_QUEUE_SIZE,
 )
 from strategy import BrooksStrategy
 from trade_logger import TradeLogger
 from user_manager import TradingUser
 from workers import kline_producer, user_worker, print_stats_periodically
+from workers.inbox import UserInbox
 
-SYMBOL = CONFIG_SYMBOL
-
-
-def setup_logging():
-    """配置日志系统"""
-    from config import setup_logging as config_setup_logging
-    return config_setup_logging()
+RT = load_runtime_config()
 
 
 async def main() -> None:
@@ -49,10 +49,9 @@ async def main() -> None:
     logging.info("=" * 60)
 
     credentials = load_user_credentials()
-    logging.info(f"已加载 {len(credentials)} 组用户凭据")
+    logging.info("已加载 %d 组用户凭据", len(credentials))
 
-    if OBSERVE_MODE and len(credentials) == 0:
-        from config import UserCredentials
+    if RT.observe_mode and len(credentials) == 0:
         credentials = [UserCredentials(api_key="", api_secret="")]
         logging.info("观察模式：使用默认用户（无需 API 密钥）")
 
@@ -62,79 +61,68 @@ async def main() -> None:
         )
 
     users = [TradingUser(f"User{i+1}", cred) for i, cred in enumerate(credentials)]
-    logging.info(f"已创建 {len(users)} 个交易用户: {[u.name for u in users]}")
+    logging.info("已创建 %d 个交易用户: %s", len(users), [u.name for u in users])
 
     _log_mode_info()
-    logging.info(f"交易对: {SYMBOL}, K线周期: {KLINE_INTERVAL}")
+    logging.info("交易对: %s, K线周期: %s", RT.symbol, RT.kline_interval)
+    logging.info("WebSocket 队列容量: %d", BSM_QUEUE_SIZE)
 
-    strategy = BrooksStrategy()
-
-    trade_logger = TradeLogger(redis_url=REDIS_URL)
+    # TradeLogger 初始化含 Redis 连接 + ping（阻塞 I/O），与策略初始化并行放到线程中
+    strategy, trade_logger = await asyncio.gather(
+        asyncio.to_thread(BrooksStrategy),
+        asyncio.to_thread(TradeLogger, redis_url=REDIS_URL),
+    )
 
-    user_queues = [asyncio.Queue() for _ in users]
-    close_queues = {user.name: asyncio.Queue() for user in users}
+    # 每用户一个收件箱：信号积压满时丢弃并计数，平仓请求积压满时等待（背压），均不无限堆积
+    inboxes = {user.name: UserInbox(KLINE_QUEUE_MAX, CLOSE_QUEUE_MAX) for user in users}
 
     logging.info("正在启动所有任务...")
 
-    tasks = [
-        asyncio.create_task(
-            kline_producer(user_queues, close_queues, strategy, trade_logger)
-        ),
-    ]
-
-    if DELTA_ENABLED:
-        from delta_flow import aggtrade_worker
-        tasks.append(
-            asyncio.create_task(
-                aggtrade_worker(SYMBOL, REDIS_URL, KLINE_INTERVAL)
-            )
-        )
-        logging.info("Delta 订单流分析已启用")
-    else:
-        logging.info("Delta 订单流分析已禁用（DELTA_ENABLED=false）")
-
-    for user, queue in zip(users, user_queues):
-        tasks.append(
-            asyncio.create_task(
-                user_worker(user, queue, close_queues[user.name], trade_logger)
-            )
-        )
-
-    tasks.append(
-        asyncio.create_task(
-            print_stats_periodically(trade_logger, users)
-        )
-    )
-
-    logging.info(f"已创建 {len(tasks)} 个任务")
-    logging.info("所有任务已启动，程序运行中...")
-
     try:
-        await asyncio.gather(*tasks)
-    except asyncio.CancelledError:
-        logging.info("任务已被取消")
-    except Exception as e:
-        logging.error(f"发生错误: {e}", exc_info=True)
+        # TaskGroup：任一任务异常或主任务被取消时自动取消其余任务并等待其结束
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(
+                kline_producer(inboxes, strategy, trade_logger)
+            )
+            task_count = 1
+
+            if DELTA_ENABLED:
+                from delta_flow import aggtrade_worker
+                tg.create_task(aggtrade_worker(RT.symbol, REDIS_URL, RT.kline_interval))
+                task_count += 1
+                logging.info("Delta 订单流分析已启用")
+            else:
+                logging.info("Delta 订单流分析已禁用（DELTA_ENABLED=false）")
+
+            for user in users:
+                tg.create_task(user_worker(user, inboxes[user.name], trade_logger))
+                task_count += 1
+
+            tg.create_task(print_stats_periodically(trade_logger, users))
+            task_count += 1
+
+            logging.info("已创建 %d 个任务", task_count)
+            logging.info("所有任务已启动，程序运行中...")
+    except* Exception as eg:
+        # TaskGroup 以 ExceptionGroup 抛出子任务异常，逐个记录；
+        # 取消（CancelledError）不在此捕获，执行 finally 清理后继续向上传播
+        for e in eg.exceptions:
+            logging.error("发生错误: %s", e, exc_info=e)
     finally:
         logging.info("正在清理资源...")
 
-        for task in tasks:
-            if not task.done():
-                task.cancel()
-
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
-
-        for user in users:
-            try:
-                await user.close()
-            except Exception as e:
-                logging.warning(f"关闭用户 {user.name} 连接时出错: {e}")
+        # 并发关闭各用户客户端，单个失败不影响其余
+        results = await asyncio.gather(
+            *(user.close() for user in users), return_exceptions=True
+        )
+        for user, res in zip(users, results):
+            if isinstance(res, Exception):
+                logging.warning("关闭用户 %s 连接时出错: %s", user.name, res)
 
         try:
             await trade_logger.close()
         except Exception as e:
-            logging.warning(f"关闭交易日志器时出错: {e}")
+            logging.warning("关闭交易日志器时出错: %s", e)
 
         logging.info("程序已正常退出")
 
@@ -142,17 +130,25 @@ async def main() -> None:
 def _log_mode_info():
     """记录运行模式信息"""
     sep = "=" * 60
-    if OBSERVE_MODE:
-        line1 = "观察模式已启用 - 将进行模拟交易，不会实际下单"
-        line2 = f"模拟资金: {OBSERVE_BALANCE} USDT, 仓位: {POSITION_SIZE_PERCENT}%, 杠杆: {LEVERAGE}x"
+    if RT.observe_mode:
+        logging.info(
+            "%s\n观察模式已启用 - 将进行模拟交易，不会实际下单\n"
+            "模拟资金: %s USDT, 仓位: %s%%, 杠杆: %sx\n%s",
+            sep, RT.observe_balance, RT.position_size_percent, RT.leverage, sep,
+        )
     else:
-        line1 = "实际交易模式 - 将进行真实下单"
-        line2 = f"仓位: {POSITION_SIZE_PERCENT}%, 杠杆: {LEVERAGE}x"
-    for line in (sep, line1, line2, sep):
-        logging.info(line)
-        print(line)
+        logging.info(
+            "%s\n实际交易模式 - 将进行真实下单\n仓位: %s%%, 杠杆: %sx\n%s",
+            sep, RT.position_size_percent, RT.leverage, sep,
+        )
 
 
 if __name__ == "__main__":
     setup_logging()
-    asyncio.run(main())
+    # 可选 uvloop（libuv 事件循环），未安装时使用标准 asyncio 循环；
+    # 通过 Runner 的 loop_factory 指定，不改全局事件循环策略
+    loop_factory = uvloop.new_event_loop if uvloop is not None else None
+    if loop_factory is not None:
+        logging.info("事件循环: uvloop")
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        runner.run(main())
@@ -18,6 +18,12 @@ from utils import round_quantity_to_step_size
 
 SYMBOL = CONFIG_SYMBOL
 
+# 入场方式查表：is_spike -> (entry_order_type, 日志用中文名)
+ENTRY_META = {
+    True: ("market", "市价"),
+    False: ("limit", "限价"),
+}
+
 
 def _extract_signal_params(signal: Dict) -> Dict:
     return {
@@ -39,6 +45,7 @@ async def execute_observe_order(
     calculate_order_quantity_func,
 ) -> None:
     params = _extract_signal_params(signal)
+    entry_order_type, entry_type = ENTRY_META[bool(params["is_spike"])]
     trade_logger.open_position(
         user=user.name,
         signal=signal["signal"],
@@ -55,13 +62,16 @@ async def execute_observe_order(
         is_observe=True,
         tp1_close_ratio=params["tp1_close_ratio"],
         is_climax_bar=False,
-        entry_order_type="market" if params["is_spike"] else "limit",
+        entry_order_type=entry_order_type,
     )
-    entry_type = "市价" if params["is_spike"] else "限价"
+    # tp1_price / tp2_price 来自 signal.get，可能为 None，不能直接套 :.2f
+    tp1_price, tp2_price = params["tp1_price"], params["tp2_price"]
     logging.info(
-        f"[{user.name}] 观察模式: {signal['signal']} {signal['side']} @ {signal['price']:.2f} ({entry_type}), "
-        f"数量={order_qty:.4f}, SL={signal['stop_loss']:.2f}, "
-        f"TP1={params['tp1_price']:.2f}, TP2={params['tp2_price']:.2f}"
+        "[%s] 观察模式: %s %s @ %.2f (%s), 数量=%.4f, SL=%.2f, TP1=%s, TP2=%s",
+        user.name, signal["signal"], signal["side"], signal["price"], entry_type,
+        order_qty, signal["stop_loss"],
+        f"{tp1_price:.2f}" if tp1_price is not None else "N/A",
+        f"{tp2_price:.2f}" if tp2_price is not None else "N/A",
     )
 
 
@@ -71,12 +81,13 @@ async def execute_live_order(
     order_qty: float,
     position_value: float,
     trade_logger: TradeLogger,
-    signal_queue: asyncio.Queue,
 ) -> bool:
     params = _extract_signal_params(signal)
-    is_spike = params["is_spike"]
+    is_spike = bool(params["is_spike"])
+    entry_order_type, entry_type = ENTRY_META[is_spike]
 
     try:
+        await user.wait_pending_cancels()
         if is_spike:
             actual_price, actual_qty = await _execute_market_entry(
                 user, signal, order_qty
@@ -105,7 +116,7 @@ async def execute_live_order(
             tp1_close_ratio=params["tp1_close_ratio"],
             is_climax_bar=False,
             hard_stop_loss=None,
-            entry_order_type="market" if is_spike else "limit",
+            entry_order_type=entry_order_type,
         )
 
         await asyncio.sleep(1)
@@ -138,7 +149,6 @@ async def execute_live_order(
             except Exception as tp1_err:
                 logging.error(f"[{user.name}] TP1 挂单失败: {tp1_err}")
 
-        entry_type = "市价" if is_spike else "限价"
         logging.info(
             f"[{user.name}] 实盘{entry_type}开仓: {signal['signal']} {signal['side']} "
             f"@ {actual_price:.2f}, 数量={actual_qty:.4f}"
@@ -217,15 +227,20 @@ async def _cancel_related_orders(
     trade_logger: TradeLogger,
     reason: str = "平仓前撤单",
 ) -> None:
-    order_ids = trade_logger.get_pending_order_ids(user.name)
+    pending = [(t, oid) for t, oid in trade_logger.get_pending_order_ids(user.name).items() if oid]
+    if not pending:
+        return
+    # 各挂单撤销互不依赖，并发发出
+    results = await asyncio.gather(
+        *(user.cancel_order(SYMBOL, oid) for _, oid in pending),
+        return_exceptions=True,
+    )
     cancelled = []
-    for order_type, order_id in order_ids.items():
-        if order_id:
-            try:
-                await user.cancel_order(SYMBOL, order_id)
-                cancelled.append(f"{order_type}={order_id}")
-            except Exception as e:
-                logging.warning(f"[{user.name}] 撤销 {order_type}={order_id} 失败: {e}")
+    for (order_type, order_id), res in zip(pending, results):
+        if isinstance(res, Exception):
+            logging.warning(f"[{user.name}] 撤销 {order_type}={order_id} 失败: {res}")
+        else:
+            cancelled.append(f"{order_type}={order_id}")
     if cancelled:
         logging.info(f"[{user.name}] {reason} - 已撤销: {', '.join(cancelled)}")
         trade_logger.clear_order_ids(user.name)
@@ -271,7 +286,8 @@ async def handle_close_request(
                     quantity=close_qty,
                 )
                 logging.info(f"[{user.name}] 平仓成功: {exit_reason}")
-            await user.cancel_all_orders(SYMBOL)
+            # 兜底撤单放到后台，下一次开仓前再等待其完成
+            user.cancel_all_orders_in_background(SYMBOL)
             trade_logger.clear_order_ids(user.name)
         return True
     except Exception as close_err:
@@ -8,16 +8,20 @@ from __future__ import annotations
 
 import logging
 from dataclasses import dataclass, field
+from itertools import islice
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 
 from logic.constants import (
-    SignalResult, SignalType, DIR_LONG, DIR_SHORT,
+    SignalResult, SignalType, MarketState, AlwaysIn,
     EMA_PERIOD, ATR_PERIOD, is_spike_signal, signal_side,
     ENABLE_BREAKOUT_MODE, BREAKOUT_MODE_ATR_MULT,
 )
-from logic.indicators import compute_ema, compute_atr
+from logic.indicators import (
+    compute_ema_np, compute_atr_np, step_ema, step_atr, ema_alpha, atr_alpha,
+)
 from logic.swing_tracker import SwingTracker
 from logic.hl_counter import HLCounter
 from logic.market_state import MarketStateTracker
@@ -26,8 +30,8 @@ from logic.filters import (
     SignalCooldownTracker, MeasuringGapTracker, BreakoutModeTracker,
 )
 from logic.signals import SignalContext
-from logic.scan_market import scan_market
-from logic.stop_loss import calculate_unified_stop_loss
+from logic.scan_market import scan_market_both
+from logic.stop_loss import calculate_unified_stop_loss, check_soft_stop as _check_soft_stop
 from logic.take_profit import get_scalp_tp1, get_measured_move_tp2
 
 logger = logging.getLogger(__name__)
@@ -64,13 +68,37 @@ class BrooksStrategy:
 
     _bar_count: int = 0
 
+    # 指标缓存：与上一根衔接时只递推最新一根
+    _ema_arr: Optional[np.ndarray] = field(default=None, repr=False)
+    _atr_arr: Optional[np.ndarray] = field(default=None, repr=False)
+    _ind_ts: Optional[int] = field(default=None, repr=False)
+
+    # 帧缓存：同一帧重复调用直接返回
+    _frame_key: Optional[tuple[int, int, float]] = field(default=None, repr=False)
+    _frame_result: Optional[SignalResult] = field(default=None, repr=False)
+
     # ── 主入口 ─────────────────────────────────────────────────────
 
     def on_new_bar(self, df: pd.DataFrame) -> Optional[SignalResult]:
         """
         新 K 线收盘后调用。df 需包含列 open/high/low/close。
         返回 SignalResult（含 tp1/tp2）或 None。
+
+        同一帧（长度、最后一根 timestamp 与收盘价均相同，如重连后无新 K 线）
+        重复调用时直接返回上次结果，不会让各追踪器重复推进一根；
+        最后一根被补数据修正过收盘价时指纹不同，照常重算。
         """
+        key = None
+        if len(df) and "timestamp" in df.columns:
+            key = (len(df), int(df["timestamp"].iat[-1]), float(df["close"].iat[-1]))
+        if key is not None and key == self._frame_key:
+            return self._frame_result
+        result = self._on_new_bar(df)
+        self._frame_key = key
+        self._frame_result = result
+        return result
+
+    def _on_new_bar(self, df: pd.DataFrame) -> Optional[SignalResult]:
         n = len(df)
         if n < 30:
             return None
@@ -79,10 +107,13 @@ class BrooksStrategy:
         lows = df["low"]
         opens = df["open"]
         closes = df["close"]
+        # 策略自身的标量读取统一走 ndarray，不经 pandas 索引器
+        h = highs.values
+        l = lows.values
 
-        ema = compute_ema(closes, self.ema_period)
-        atr_s = compute_atr(highs, lows, closes, self.atr_period)
-        atr_val = float(atr_s.iloc[-2]) if len(atr_s) >= 2 else 0.0
+        # EMA 以 ndarray 直接传给各追踪器，不再每根包一层 Series
+        ema_arr, atr_arr = self._update_indicators(df)
+        atr_val = float(atr_arr[-2]) if len(atr_arr) >= 2 else 0.0
         if atr_val <= 0:
             return None
 
@@ -92,9 +123,9 @@ class BrooksStrategy:
         # 1. 更新追踪系统
         self.swings.update(highs, lows)
         self.hl.update(highs, lows, opens, closes, atr_val, self.swings)
-        self.mstate.update(highs, lows, opens, closes, ema, atr_val, self.swings)
-        self.gap20.calculate_gap_count(closes, lows, highs, ema, atr_val)
-        self.gap20.update(closes, highs, lows, opens, ema, atr_val)
+        self.mstate.update(highs, lows, opens, closes, ema_arr, atr_val, self.swings)
+        self.gap20.calculate_gap_count(closes, lows, highs, ema_arr, atr_val)
+        self.gap20.update(closes, highs, lows, opens, ema_arr, atr_val)
         self.barb_wire.update(highs, lows, opens, closes, atr_val)
         self.measuring_gap.update(highs, lows, opens, closes, atr_val)
         self._update_trend_line(atr_val)
@@ -104,8 +135,8 @@ class BrooksStrategy:
         if self.barb_wire.breakout_direction and ENABLE_BREAKOUT_MODE:
             bd = self.barb_wire.breakout_direction
             self.breakout_mode.activate(
-                bd, float(closes.iloc[-2]),
-                float(highs.iloc[-2]) if bd == "up" else float(lows.iloc[-2]),
+                bd, float(closes.values[-2]),
+                float(h[-2]) if bd == "up" else float(l[-2]),
             )
         self.breakout_mode.tick(highs, lows, atr_val)
 
@@ -133,12 +164,7 @@ class BrooksStrategy:
         is_ttr = self.mstate.is_ttr(highs, lows, atr_val)
 
         # 4. 扫描信号 — EA 先多后空
-        result: Optional[SignalResult] = None
-        for direction in (DIR_LONG, DIR_SHORT):
-            r = scan_market(direction, highs, lows, opens, closes, atr_val, is_ttr, ctx)
-            if r is not None:
-                result = r
-                break
+        result = scan_market_both(highs, lows, opens, closes, atr_val, is_ttr, ctx)
 
         # 同步 ctx 中可能被修改的突破追踪状态
         self.recent_breakout = ctx.recent_breakout
@@ -155,10 +181,10 @@ class BrooksStrategy:
             return None
 
         # 6. 计算 TP
-        h1 = float(highs.iloc[-2])
-        l1 = float(lows.iloc[-2])
-        h2 = float(highs.iloc[-3]) if n >= 3 else h1
-        l2 = float(lows.iloc[-3]) if n >= 3 else l1
+        h1 = float(h[-2])
+        l1 = float(l[-2])
+        h2 = float(h[-3]) if n >= 3 else h1
+        l2 = float(l[-3]) if n >= 3 else l1
         side = signal_side(result.signal_type)
 
         if result.stop_loss == 0:
@@ -187,10 +213,10 @@ class BrooksStrategy:
                 result.entry_price = l1
 
         logger.info(
-            f"信号: {result.signal_type.name} {side} "
-            f"entry={result.entry_price:.2f} sl={result.stop_loss:.2f} "
-            f"tp1={result.tp1:.2f} tp2={result.tp2:.2f} "
-            f"state={self.mstate.state.value} AI={self.mstate.always_in.name}"
+            "信号: %s %s entry=%.2f sl=%.2f tp1=%.2f tp2=%.2f state=%s AI=%s",
+            result.signal_type.name, side,
+            result.entry_price, result.stop_loss, result.tp1, result.tp2,
+            self.mstate.state.value, self.mstate.always_in.name,
         )
         return result
 
@@ -200,8 +226,7 @@ class BrooksStrategy:
         self, side: str, technical_sl: float,
         close: float, recent_closes: list[float] | None = None,
     ) -> bool:
-        from logic.stop_loss import check_soft_stop
-        return check_soft_stop(side, technical_sl, close, recent_closes)
+        return _check_soft_stop(side, technical_sl, close, recent_closes)
 
     # ── 高潮退出检查 ─────────────────────────────────────────────
 
@@ -211,15 +236,15 @@ class BrooksStrategy:
             return False
         if self.mstate.tight_channel_extreme <= 0:
             return False
-        c1 = float(df["close"].iloc[-2])
-        o1 = float(df["open"].iloc[-2])
-        h1 = float(df["high"].iloc[-2])
-        l1 = float(df["low"].iloc[-2])
+        c = df["close"].values
+        o = df["open"].values
+        c1 = c[-2]
+        o1 = o[-2]
+        h1 = df["high"].values[-2]
+        l1 = df["low"].values[-2]
         body = abs(c1 - o1)
-        avg_body = sum(
-            abs(float(df["close"].iloc[-1 - i]) - float(df["open"].iloc[-1 - i]))
-            for i in range(2, 7)
-        ) / 5.0
+        # bar[2..6] 平均实体（由近及远累加，与 EA 顺序一致）
+        avg_body = np.abs(c[-3:-8:-1] - o[-3:-8:-1]).sum() / 5.0
         if avg_body <= 0 or body < avg_body * 3.0:
             return False
         tc = self.mstate
@@ -239,6 +264,45 @@ class BrooksStrategy:
 
     # ── 内部 ──────────────────────────────────────────────────────
 
+    def _update_indicators(self, df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        """
+        返回与 df 对齐的 EMA / ATR 数组。
+        df 仅比上次多出一根（按 timestamp 衔接）时 O(1) 递推，否则整段重算。
+        """
+        n = len(df)
+        ts = df["timestamp"].values if "timestamp" in df.columns else None
+        ema_prev, atr_prev = self._ema_arr, self._atr_arr
+        if (
+            n >= 2 and ts is not None and ema_prev is not None and atr_prev is not None
+            and self._ind_ts is not None and len(ema_prev) >= n - 1
+            and ts[-2] == self._ind_ts
+        ):
+            h = df["high"].values
+            l = df["low"].values
+            c = df["close"].values
+            ema_arr = np.empty(n, dtype=np.float64)
+            atr_arr = np.empty(n, dtype=np.float64)
+            ema_arr[:-1] = ema_prev[len(ema_prev) - (n - 1):]
+            atr_arr[:-1] = atr_prev[len(atr_prev) - (n - 1):]
+            ema_arr[-1] = step_ema(ema_arr[-2], float(c[-1]), ema_alpha(self.ema_period))
+            atr_arr[-1] = step_atr(
+                atr_arr[-2], float(h[-1]), float(l[-1]), float(c[-2]),
+                atr_alpha(self.atr_period),
+            )
+        else:
+            closes = df["close"].to_numpy(dtype=np.float64, copy=False)
+            ema_arr = compute_ema_np(closes, self.ema_period)
+            atr_arr = compute_atr_np(
+                df["high"].to_numpy(dtype=np.float64, copy=False),
+                df["low"].to_numpy(dtype=np.float64, copy=False),
+                closes,
+                self.atr_period,
+            )
+        self._ema_arr = ema_arr
+        self._atr_arr = atr_arr
+        self._ind_ts = int(ts[-1]) if ts is not None else None
+        return ema_arr, atr_arr
+
     def _update_trend_line(self, atr: float) -> None:
         if len(self.swings.swings) < 4 or atr <= 0:
             return
@@ -246,21 +310,23 @@ class BrooksStrategy:
         td = self.mstate.trend_direction
         sp = self.swings.swings
 
+        # 只需最近两个同类波段点：islice 找到即停，直接用 SwingPoint 字段，不另建 (price, bar) 元组
         if ai == AlwaysIn.LONG or td == "up":
-            lows = [(s.price, s.bar_index) for s in sp if not s.is_high][:2]
-            if len(lows) >= 2 and lows[1][0] < lows[0][0] and lows[1][1] > lows[0][1]:
+            lows = list(islice((s for s in sp if not s.is_high), 2))
+            if len(lows) >= 2 and lows[1].price < lows[0].price and lows[1].bar_index > lows[0].bar_index:
                 sl_end, sl_start = lows[0], lows[1]
-                if sl_start[1] != sl_end[1]:
-                    slope = (sl_end[0] - sl_start[0]) / (sl_start[1] - sl_end[1])
-                    tl_now = sl_end[0] + slope * (sl_end[1] - 1)
+                if sl_start.bar_index != sl_end.bar_index:
+                    slope = (sl_end.price - sl_start.price) / (sl_start.bar_index - sl_end.bar_index)
+                    tl_now = sl_end.price + slope * (sl_end.bar_index - 1)
                     self.trend_line_price = tl_now
                     # 检测突破（使用最近 close）
                     if not self.trend_line_broken and tl_now > 0:
                         pass  # 简化：通过 swing 结构判断 MTR
 
         if ai == AlwaysIn.SHORT or td == "down":
-            highs = [(s.price, s.bar_index) for s in sp if s.is_high][:2]
-            if len(highs) >= 2 and highs[1][0] > highs[0][0] and highs[1][1] > highs[0][1]:
+            highs = list(islice((s for s in sp if s.is_high), 2))
+            if (len(highs) >= 2 and highs[1].price > highs[0].price
+                    and highs[1].bar_index > highs[0].bar_index):
                 pass
 
     def _update_breakout_pullback_tracking(self) -> None:
@@ -277,8 +343,3 @@ class BrooksStrategy:
             self.breakout_dir = ""
             self.breakout_level = 0.0
             self.breakout_bar_age = 0
-
-
-# 需要导入 — 放在方法内以避免循环引用
-from logic.constants import MarketState
-from logic.constants import AlwaysIn
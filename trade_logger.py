@@ -10,10 +10,13 @@
 import json
 import logging
 import threading
+import time
 from dataclasses import asdict, dataclass, field, fields
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 
+from config import FEE_RATE_MARKET, FEE_RATE_LIMIT
+
 try:
     import redis
 except ImportError:
@@ -22,7 +25,6 @@ except ImportError:
 
 def _fee_buffer_pct(entry_order_type: str) -> float:
     """开仓+平仓费率（平仓按市价 0.05%），用于保本止损缓冲。"""
-    from config import FEE_RATE_MARKET, FEE_RATE_LIMIT
     open_rate = FEE_RATE_LIMIT if (entry_order_type or "limit").lower() == "limit" else FEE_RATE_MARKET
     return open_rate + FEE_RATE_MARKET
 
@@ -39,7 +41,6 @@ def _trade_fee_usdt(
     单边费率下：(开仓费率+平仓费率)×名义价值 合计手续费。
     若有 TP1，则开仓名义用 full qty，平仓分两笔：TP1 部分 + 剩余部分。
     """
-    from config import FEE_RATE_MARKET, FEE_RATE_LIMIT
     open_rate = FEE_RATE_LIMIT if (entry_order_type or "limit").lower() == "limit" else FEE_RATE_MARKET
     close_rate = FEE_RATE_MARKET
     notional_open = entry_price * quantity
@@ -210,20 +211,22 @@ class TradeLogger:
         except Exception as e:
             logging.debug(f"[{user}] Redis 写入 position 失败: {e}")
 
-    def _redis_load_position(self, user: str) -> Optional[Trade]:
-        """从 Redis 读取 trade:position:{user}"""
+    def _redis_load_state(self, user: str) -> tuple[Optional[Trade], Optional[Dict[str, Any]]]:
+        """MGET 一次往返读取 trade:position:{user} 与 trade:aux:{user}"""
         r = self._redis()
         if not r:
-            return None
+            return None, None
         try:
-            key = self.REDIS_KEY_POSITION.format(user=user)
-            raw = r.get(key)
-            if not raw:
-                return None
-            return _dict_to_trade(json.loads(raw))
+            raw_pos, raw_aux = r.mget(
+                self.REDIS_KEY_POSITION.format(user=user),
+                self.REDIS_KEY_AUX.format(user=user),
+            )
+            trade = _dict_to_trade(json.loads(raw_pos)) if raw_pos else None
+            aux = json.loads(raw_aux) if raw_aux else None
+            return trade, aux
         except Exception as e:
-            logging.debug(f"[{user}] Redis 读取 position 失败: {e}")
-            return None
+            logging.debug(f"[{user}] Redis 读取 position/aux 失败: {e}")
+            return None, None
 
     def _redis_save_aux(self, user: str) -> None:
         """写入辅助状态到 Redis trade:aux:{user}（tp1_placed, tp2_placed, trailing, cooldown_until）"""
@@ -232,30 +235,35 @@ class TradeLogger:
             return
         try:
             key = self.REDIS_KEY_AUX.format(user=user)
-            aux = {
-                "tp1_placed": self._tp1_order_placed.get(user, False),
-                "tp2_placed": self._tp2_order_placed.get(user, False),
-                "trailing": self._trailing_stop.get(user),
-                "cooldown_until": self.cooldown_until.get(user),
-            }
-            r.set(key, json.dumps(aux))
+            r.set(key, json.dumps(self._aux_payload(user)))
         except Exception as e:
             logging.debug(f"[{user}] Redis 写入 aux 失败: {e}")
 
-    def _redis_load_aux(self, user: str) -> Optional[Dict[str, Any]]:
-        """从 Redis 读取 trade:aux:{user}"""
+    def _aux_payload(self, user: str) -> Dict[str, Any]:
+        """trade:aux:{user} 的内容"""
+        return {
+            "tp1_placed": self._tp1_order_placed.get(user, False),
+            "tp2_placed": self._tp2_order_placed.get(user, False),
+            "trailing": self._trailing_stop.get(user),
+            "cooldown_until": self.cooldown_until.get(user),
+        }
+
+    def _redis_save_state(self, user: str, trade: Optional[Trade]) -> None:
+        """position + aux 经 pipeline 一次往返写入"""
         r = self._redis()
         if not r:
-            return None
+            return
         try:
-            key = self.REDIS_KEY_AUX.format(user=user)
-            raw = r.get(key)
-            if not raw:
-                return None
-            return json.loads(raw)
+            pipe = r.pipeline(transaction=False)
+            key = self.REDIS_KEY_POSITION.format(user=user)
+            if trade is None:
+                pipe.delete(key)
+            else:
+                pipe.set(key, json.dumps(_trade_to_dict(trade)))
+            pipe.set(self.REDIS_KEY_AUX.format(user=user), json.dumps(self._aux_payload(user)))
+            pipe.execute()
         except Exception as e:
-            logging.debug(f"[{user}] Redis 读取 aux 失败: {e}")
-            return None
+            logging.debug(f"[{user}] Redis 写入 position/aux 失败: {e}")
 
     def _redis_del_user(self, user: str) -> None:
         """删除该用户的 position 与 aux 键"""
@@ -263,8 +271,10 @@ class TradeLogger:
         if not r:
             return
         try:
-            r.delete(self.REDIS_KEY_POSITION.format(user=user))
-            r.delete(self.REDIS_KEY_AUX.format(user=user))
+            r.delete(
+                self.REDIS_KEY_POSITION.format(user=user),
+                self.REDIS_KEY_AUX.format(user=user),
+            )
         except Exception as e:
             logging.debug(f"[{user}] Redis 删除键失败: {e}")
 
@@ -304,7 +314,7 @@ class TradeLogger:
                     return None
 
                 # 先尝试从 Redis 恢复（与币安一致则用 Redis 状态）
-                trade_redis = self._redis_load_position(user)
+                trade_redis, aux = self._redis_load_state(user)
                 if trade_redis is not None:
                     redis_side = getattr(trade_redis, "side", "")
                     redis_qty = float(getattr(trade_redis, "quantity", 0) or 0)
@@ -313,7 +323,7 @@ class TradeLogger:
                         trade_redis.entry_price = entry_price
                         trade_redis.remaining_quantity = quantity
                         self.positions[user] = trade_redis
-                        aux = self._redis_load_aux(user) or {}
+                        aux = aux or {}
                         self._tp1_order_placed[user] = bool(aux.get("tp1_placed", False))
                         self._tp2_order_placed[user] = bool(aux.get("tp2_placed", False))
                         if aux.get("trailing"):
@@ -384,8 +394,7 @@ class TradeLogger:
 
                 self.positions[user] = trade
                 self._tp2_order_placed[user] = False
-                self._redis_save_position(user, trade)
-                self._redis_save_aux(user)
+                self._redis_save_state(user, trade)
 
                 tp1_already_hit = (side == "buy" and current_price >= tp1_price) or (
                     side == "sell" and current_price <= tp1_price
@@ -475,8 +484,7 @@ class TradeLogger:
             self.positions[user] = trade
             self._tp2_order_placed[user] = False
             self._tp1_order_placed[user] = False
-            self._redis_save_position(user, trade)
-            self._redis_save_aux(user)
+            self._redis_save_state(user, trade)
             logging.info(
                 f"用户 {user} 开仓: {signal} {side} @ {entry_price:.2f}, "
                 f"止损={stop_loss:.2f}, TP1={tp1_price or take_profit:.2f}, TP2={tp2_price or take_profit:.2f}"
@@ -689,8 +697,7 @@ class TradeLogger:
                 trade.trailing_stop_activated = True
                 trade.trailing_stop_price = ts_state["trailing_stop"]
                 trade.trailing_max_profit_r = profit_in_r
-                self._redis_save_position(user, trade)
-                self._redis_save_aux(user)
+                self._redis_save_state(user, trade)
                 logging.info(
                     f"📈 [{user}] 追踪止损已激活！盈利={profit_in_r:.2f}R, "
                     f"追踪止损={ts_state['trailing_stop']:.2f}"
@@ -716,8 +723,7 @@ class TradeLogger:
                     trade.stop_loss = ts_state["trailing_stop"]
                     trade.trailing_stop_price = ts_state["trailing_stop"]
                     trade.trailing_max_profit_r = ts_state["max_profit"]
-                    self._redis_save_position(user, trade)
-                    self._redis_save_aux(user)
+                    self._redis_save_state(user, trade)
 
             if trade.exit_stage == 0 and trade.tp1_price:
                 tp1_hit = (trade.side == "buy" and current_price >= float(trade.tp1_price)) or (
@@ -747,8 +753,7 @@ class TradeLogger:
                     ts_state["activated"] = True
                     if trade.tp2_price:
                         self._tp2_order_placed[user] = False
-                    self._redis_save_position(user, trade)
-                    self._redis_save_aux(user)
+                    self._redis_save_state(user, trade)
                     logging.info(
                         f"🎯 [{user}] TP1触发！平仓{int(close_ratio*100)}% @ {float(trade.tp1_price):.2f}, "
                         f"保本止损={breakeven_stop:.2f}"
@@ -800,8 +805,7 @@ class TradeLogger:
                         trade.stop_loss = be_stop
                         trade.breakeven_moved = True
                         ts_state["trailing_stop"] = be_stop
-                        self._redis_save_position(user, trade)
-                        self._redis_save_aux(user)
+                        self._redis_save_state(user, trade)
                         logging.info(f"💡 [{user}] Breakeven触发！止损移至入场+手续费缓冲: {be_stop:.2f}")
 
                 # 止损检查（收盘时）
@@ -839,10 +843,12 @@ class TradeLogger:
         with self._lock:
             self._tp1_order_placed[user] = True
             trade = self.positions.get(user)
-            if trade and order_id:
-                trade.tp1_order_id = order_id
-                self._redis_save_position(user, trade)
-            self._redis_save_aux(user)
+            if trade:
+                if order_id:
+                    trade.tp1_order_id = order_id
+                self._redis_save_state(user, trade)
+            else:
+                self._redis_save_aux(user)
 
     def tp1_order_placed(self, user: str) -> bool:
         with self._lock:
@@ -960,8 +966,7 @@ class TradeLogger:
                     ts["trailing_stop"] = min(ts.get("trailing_stop", float("inf")), breakeven_stop)
                 ts["activated"] = True
             self._tp1_order_placed[user] = False
-            self._redis_save_position(user, trade)
-            self._redis_save_aux(user)
+            self._redis_save_state(user, trade)
             logging.info(
                 f"[{user}] TP1 已由交易所触发，已同步: 剩余={remaining_quantity:.4f}, "
                 f"保本止损={breakeven_stop:.2f}"
@@ -972,7 +977,6 @@ class TradeLogger:
         self.kline_count += 1
 
     def is_in_cooldown(self, user: str) -> bool:
-        import time
         cooldown_end = self.cooldown_until.get(user)
         if not cooldown_end:
             return False
@@ -983,7 +987,6 @@ class TradeLogger:
         return False
 
     def set_cooldown(self, user: str, cooldown_bars: int = 3, kline_interval_seconds: int = 300):
-        import time
         cooldown_seconds = cooldown_bars * kline_interval_seconds
         self.cooldown_until[user] = time.time() + cooldown_seconds
         self._redis_save_aux(user)
@@ -1004,18 +1007,17 @@ class TradeLogger:
         self, user: Optional[str] = None, is_observe: Optional[bool] = None
     ) -> Dict[str, Any]:
         """从内存已平仓记录计算统计"""
+        # 过滤与统计各一遍完成
         with self._lock:
-            items = [
-                t
+            pnls = [
+                t.pnl
                 for t in self._closed_trades
-                if t.status == "closed" and (t.pnl is not None)
+                if t.status == "closed" and t.pnl is not None
+                and (user is None or t.user == user)
+                and (is_observe is None or getattr(t, "is_observe", True) == is_observe)
             ]
-            if user is not None:
-                items = [t for t in items if t.user == user]
-            if is_observe is not None:
-                items = [t for t in items if getattr(t, "is_observe", True) == is_observe]
 
-        if not items:
+        if not pnls:
             return {
                 "total_trades": 0,
                 "winning_trades": 0,
@@ -1026,10 +1028,9 @@ class TradeLogger:
                 "max_profit": 0.0,
                 "max_loss": 0.0,
             }
-        total = len(items)
-        winning = sum(1 for t in items if (t.pnl or 0) > 0)
-        losing = sum(1 for t in items if (t.pnl or 0) <= 0)
-        pnls = [t.pnl for t in items if t.pnl is not None]
+        total = len(pnls)
+        winning = sum(1 for p in pnls if p > 0)
+        losing = sum(1 for p in pnls if p <= 0)
         total_pnl = sum(pnls)
         return {
             "total_trades": total,
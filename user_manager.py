@@ -1,6 +1,7 @@
 import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+import time
+from typing import Any, Dict, List, Optional, Set
 
 from binance import AsyncClient
 
@@ -44,7 +45,8 @@ class TradingUser:
         self._lock = asyncio.Lock()
         self._leverage_set: Dict[str, bool] = {}  # 记录已设置杠杆的交易对
         self._cached_balance: Optional[float] = None  # 缓存的余额
-        self._balance_cache_time: float = 0  # 余额缓存时间
+        self._balance_cache_time: float = 0  # 余额缓存时间（time.monotonic）
+        self._pending_cancels: Set[asyncio.Task] = set()  # 后台撤单任务
         
         # 交易规则缓存（stepSize, minQty, tickSize）
         self._symbol_filters: Dict[str, Dict[str, Any]] = {}
@@ -111,31 +113,31 @@ class TradingUser:
             return False
 
     async def close(self) -> None:
+        await self.wait_pending_cancels()
         async with self._lock:
             if self.client is not None:
                 await self.client.close_connection()
                 logging.info("用户 %s 已断开 Binance API", self.name)
                 self.client = None
 
-    async def get_futures_balance(self, force_refresh: bool = False) -> float:
+    async def get_futures_balance(self, force_refresh: bool = False, ttl: float = 60.0) -> float:
         """
         获取合约账户 USDT 余额（可用余额）
         
         Args:
-            force_refresh: 是否强制刷新（默认使用 60 秒缓存）
+            force_refresh: 是否强制刷新（忽略缓存）
+            ttl: 缓存有效期（秒），默认 60 秒
         
         Returns:
             float: USDT 可用余额
         """
-        import time
-        
         if self.client is None:
             raise RuntimeError(f"用户 {self.name} 尚未连接客户端")
         
-        # 使用缓存（60秒内有效）
-        current_time = time.time()
+        # 使用缓存（ttl 秒内有效）
+        current_time = time.monotonic()
         if not force_refresh and self._cached_balance is not None:
-            if current_time - self._balance_cache_time < 60:
+            if current_time - self._balance_cache_time < ttl:
                 return self._cached_balance
         
         try:
@@ -162,6 +164,10 @@ class TradingUser:
                 return self._cached_balance
             raise
 
+    def invalidate_balance_cache(self) -> None:
+        """成交 / 平仓后调用：下次读取余额时强制走 API"""
+        self._balance_cache_time = float("-inf")
+
     async def get_symbol_filters(self, symbol: str, force_refresh: bool = False) -> Dict[str, Any]:
         """
         获取交易对的过滤器规则（stepSize, minQty, tickSize）。
@@ -449,6 +455,22 @@ class TradingUser:
 
         return ok
 
+    def cancel_all_orders_in_background(self, symbol: str) -> None:
+        """后台撤销全部挂单，不阻塞调用方；下次开仓前由 wait_pending_cancels 等待完成"""
+        task = asyncio.create_task(self.cancel_all_orders(symbol))
+        self._pending_cancels.add(task)
+        task.add_done_callback(self._on_cancel_done)
+
+    def _on_cancel_done(self, task: asyncio.Task) -> None:
+        self._pending_cancels.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logging.warning("[%s] 后台撤单失败: %s", self.name, task.exception())
+
+    async def wait_pending_cancels(self) -> None:
+        """等待所有后台撤单完成（开仓前调用，避免新挂单被旧撤单误撤）"""
+        if self._pending_cancels:
+            await asyncio.gather(*self._pending_cancels, return_exceptions=True)
+
     async def cancel_order(self, symbol: str, order_id: int) -> bool:
         """
         取消单个挂单
@@ -5,8 +5,13 @@
 """
 
 import logging
-from typing import Dict, List, Optional
+import time
+from bisect import bisect_right
+from types import MappingProxyType
+from typing import Optional
 
+import numpy as np
+import pandas as pd
 from binance import AsyncClient
 
 from config import (
@@ -23,8 +28,8 @@ from config import (
 SYMBOL = CONFIG_SYMBOL
 INTERVAL = AsyncClient.KLINE_INTERVAL_5MINUTE
 
-# K线周期对应的毫秒数
-KLINE_INTERVAL_MS = {
+# K线周期对应的毫秒数（只读）
+KLINE_INTERVAL_MS = MappingProxyType({
     "1m": 60 * 1000,
     "3m": 3 * 60 * 1000,
     "5m": 5 * 60 * 1000,
@@ -34,7 +39,98 @@ KLINE_INTERVAL_MS = {
     "2h": 2 * 60 * 60 * 1000,
     "4h": 4 * 60 * 60 * 1000,
     "1d": 24 * 60 * 60 * 1000,
-}
+})
+
+# K 线历史保留根数
+HISTORY_MAXLEN = 500
+
+
+class KlineBuffer:
+    """
+    K 线历史列式缓冲（timestamp / open / high / low / close 各一列 ndarray）
+
+    - 容量为 2 × maxlen，写满时把最近 maxlen 根搬回开头，追加均摊 O(1)
+    - 有效窗口始终是连续切片，to_dataframe 按列构建，无逐行 dict
+    """
+    __slots__ = ("maxlen", "timestamp", "open", "high", "low", "close", "_start", "_end")
+
+    def __init__(self, maxlen: int = HISTORY_MAXLEN):
+        cap = 2 * maxlen
+        self.maxlen = maxlen
+        self.timestamp = np.empty(cap, dtype=np.int64)
+        self.open = np.empty(cap, dtype=np.float64)
+        self.high = np.empty(cap, dtype=np.float64)
+        self.low = np.empty(cap, dtype=np.float64)
+        self.close = np.empty(cap, dtype=np.float64)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        return int(self.timestamp[self._end - 1]) if self._end > self._start else None
+
+    def clear(self) -> None:
+        self._start = self._end = 0
+
+    def append(self, ts: int, o: float, h: float, l: float, c: float) -> None:
+        if self._end == len(self.timestamp):
+            n = self._end - self._start
+            for col in (self.timestamp, self.open, self.high, self.low, self.close):
+                col[:n] = col[self._start:self._end]
+            self._start, self._end = 0, n
+        i = self._end
+        self.timestamp[i] = ts
+        self.open[i] = o
+        self.high[i] = h
+        self.low[i] = l
+        self.close[i] = c
+        self._end = i + 1
+        if self._end - self._start > self.maxlen:
+            self._start += 1
+
+    def extend_rows(self, rows: list) -> None:
+        """
+        批量追加 Binance K 线行（[open_time, "o", "h", "l", "c", ...]，按时间升序）
+
+        numpy 一次性解析数值列，按块写入，不逐行 float()。
+        """
+        m = len(rows)
+        if m == 0:
+            return
+        ts = np.fromiter((r[0] for r in rows), dtype=np.int64, count=m)
+        ohlc = np.array([r[1:5] for r in rows], dtype=np.float64)
+        if m >= self.maxlen:
+            # 新数据已填满窗口：只保留最后 maxlen 根，从头写
+            src = slice(m - self.maxlen, m)
+            self._start, self._end = 0, 0
+            ts, ohlc, m = ts[src], ohlc[src], self.maxlen
+        elif self._end + m > len(self.timestamp):
+            keep = min(len(self), self.maxlen - m)
+            for col in (self.timestamp, self.open, self.high, self.low, self.close):
+                col[:keep] = col[self._end - keep:self._end]
+            self._start, self._end = 0, keep
+        dst = slice(self._end, self._end + m)
+        self.timestamp[dst] = ts
+        self.open[dst] = ohlc[:, 0]
+        self.high[dst] = ohlc[:, 1]
+        self.low[dst] = ohlc[:, 2]
+        self.close[dst] = ohlc[:, 3]
+        self._end += m
+        self._start = max(self._start, self._end - self.maxlen)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """有效窗口 → DataFrame（列拷贝，之后缓冲区的写入不影响返回值）"""
+        s = slice(self._start, self._end)
+        return pd.DataFrame({
+            "timestamp": self.timestamp[s],
+            "open": self.open[s],
+            "high": self.high[s],
+            "low": self.low[s],
+            "close": self.close[s],
+        })
 
 
 def get_position_size_percent(balance: float) -> float:
@@ -54,6 +150,12 @@ def get_position_size_percent(balance: float) -> float:
         return LARGE_BALANCE_POSITION_PCT
 
 
+# 观察模式默认资金下的购买力（资金 × 仓位百分比 × 杠杆），均为启动时确定的常量
+_OBSERVE_BUYING_POWER = (
+    OBSERVE_BALANCE * (get_position_size_percent(OBSERVE_BALANCE) / 100) * LEVERAGE
+)
+
+
 def calculate_order_quantity(current_price: float, balance: float = None) -> float:
     """
     计算下单数量（仅用于观察模式）
@@ -76,17 +178,18 @@ def calculate_order_quantity(current_price: float, balance: float = None) -> flo
     if current_price <= 0:
         return 0.001  # 默认最小值
     
-    # 使用传入的余额或默认的观察模式余额
-    actual_balance = balance if balance is not None else OBSERVE_BALANCE
-    
-    # 动态仓位百分比
-    position_pct = get_position_size_percent(actual_balance)
-    
-    # 开仓金额 = 总资金 × 仓位百分比
-    position_value = actual_balance * (position_pct / 100)
-    
-    # 实际购买力 = 开仓金额 × 杠杆
-    buying_power = position_value * LEVERAGE
+    if balance is None:
+        # 默认观察模式余额：使用预先算好的购买力
+        buying_power = _OBSERVE_BUYING_POWER
+    else:
+        # 动态仓位百分比
+        position_pct = get_position_size_percent(balance)
+
+        # 开仓金额 = 总资金 × 仓位百分比
+        position_value = balance * (position_pct / 100)
+
+        # 实际购买力 = 开仓金额 × 杠杆
+        buying_power = position_value * LEVERAGE
     
     # 下单数量 = 购买力 / 当前价格
     quantity = buying_power / current_price
@@ -99,10 +202,10 @@ def calculate_order_quantity(current_price: float, balance: float = None) -> flo
 
 
 async def load_historical_klines(
-    client: AsyncClient, history: List[Dict], limit: int = 200
+    client: AsyncClient, history: KlineBuffer, limit: int = 200
 ) -> Optional[int]:
     """
-    加载合约历史K线数据到history列表
+    加载合约历史K线数据到 history 缓冲
     
     使用 futures_klines() 获取合约市场的K线数据，确保与合约交易价格一致。
     
@@ -121,19 +224,9 @@ async def load_historical_klines(
 
         # 清空并重新填充历史数据
         history.clear()
-        for kline in historical_klines:
-            history.append(
-                {
-                    "timestamp": int(kline[0]),
-                    "open": float(kline[1]),
-                    "high": float(kline[2]),
-                    "low": float(kline[3]),
-                    "close": float(kline[4]),
-                }
-            )
-        
-        if history:
-            last_timestamp = history[-1]["timestamp"]
+        history.extend_rows(historical_klines)
+
+        last_timestamp = history.last_timestamp
             
         logging.info(f"历史数据已加载到内存，共 {len(history)} 根K线")
     except Exception as e:
@@ -145,7 +238,7 @@ async def load_historical_klines(
 
 
 async def fill_missing_klines(
-    client: AsyncClient, history: List[Dict], last_timestamp: Optional[int] = None
+    client: AsyncClient, history: KlineBuffer, last_timestamp: Optional[int] = None
 ) -> Optional[int]:
     """
     补全缺失的K线数据（重连后使用）
@@ -154,8 +247,6 @@ async def fill_missing_klines(
     
     返回: 补全后最后一根K线的时间戳
     """
-    import time
-    
     try:
         if len(history) == 0:
             return await load_historical_klines(client, history)
@@ -163,77 +254,49 @@ async def fill_missing_klines(
         interval_ms = KLINE_INTERVAL_MS.get(KLINE_INTERVAL, 5 * 60 * 1000)
         
         if last_timestamp is None:
-            last_timestamp = history[-1].get("timestamp")
-        
-        if last_timestamp is None:
-            logging.warning("历史数据无时间戳，使用简单补全模式")
-            limit = min(100, 500 - len(history))
-            # 使用合约K线接口
-            missing_klines = await client.futures_klines(
-                symbol=SYMBOL,
-                interval=INTERVAL,
-                limit=limit,
-            )
-        else:
-            current_time_ms = int(time.time() * 1000)
-            time_gap_ms = current_time_ms - last_timestamp
-            missing_count = time_gap_ms // interval_ms
-            
-            if missing_count <= 0:
-                logging.info("没有缺失的K线数据")
-                return last_timestamp
-            
-            missing_count = min(missing_count + 1, 200)
-            
-            logging.info(
-                f"正在补全缺失的合约K线数据（从 {last_timestamp} 开始，预计 {missing_count} 根）..."
-            )
-            
-            # 使用合约K线接口
-            missing_klines = await client.futures_klines(
-                symbol=SYMBOL,
-                interval=INTERVAL,
-                startTime=last_timestamp,
-                limit=missing_count,
-            )
+            last_timestamp = history.last_timestamp
+
+        current_time_ms = time.time_ns() // 1_000_000
+        time_gap_ms = current_time_ms - last_timestamp
+        missing_count = time_gap_ms // interval_ms
+
+        if missing_count <= 0:
+            logging.info("没有缺失的K线数据")
+            return last_timestamp
+
+        missing_count = min(missing_count + 1, 200)
+
+        logging.info(
+            f"正在补全缺失的合约K线数据（从 {last_timestamp} 开始，预计 {missing_count} 根）..."
+        )
+
+        # 使用合约K线接口
+        missing_klines = await client.futures_klines(
+            symbol=SYMBOL,
+            interval=INTERVAL,
+            startTime=last_timestamp,
+            limit=missing_count,
+        )
 
         if not missing_klines:
             logging.info("没有新的K线数据需要补全")
             return last_timestamp
 
-        existing_timestamps = {kline.get("timestamp") for kline in history if kline.get("timestamp")}
-        
-        new_klines = []
-        for kline in missing_klines:
-            kline_timestamp = int(kline[0])
-            
-            if kline_timestamp in existing_timestamps:
-                continue
-            
-            kline_data = {
-                "timestamp": kline_timestamp,
-                "open": float(kline[1]),
-                "high": float(kline[2]),
-                "low": float(kline[3]),
-                "close": float(kline[4]),
-            }
-            new_klines.append(kline_data)
-            existing_timestamps.add(kline_timestamp)
+        # history 与接口返回均按时间升序：二分找到首根晚于已有最后一根的 K 线，只追加其后部分
+        cutoff = history.last_timestamp
+        start = bisect_right(missing_klines, cutoff, key=lambda k: int(k[0]))
+        new_klines = missing_klines[start:]
 
         if new_klines:
-            history.extend(new_klines)
-            history.sort(key=lambda x: x.get("timestamp", 0))
-            while len(history) > 500:
-                history.pop(0)
-            
-            new_last_timestamp = history[-1].get("timestamp") if history else None
+            history.extend_rows(new_klines)
+
             logging.info(
                 f"✅ 已补全 {len(new_klines)} 根K线，当前历史数据: {len(history)} 根"
             )
-            return new_last_timestamp
+            return history.last_timestamp
         else:
             logging.info("所有K线数据已是最新")
-            return history[-1].get("timestamp") if history else None
+            return history.last_timestamp
             
     except Exception as e:
         logging.error(f"补全K线数据失败: {e}", exc_info=True)
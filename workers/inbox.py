@@ -0,0 +1,48 @@
+"""
+用户收件箱 — 平仓请求与交易信号合并为一个优先级队列
+
+user_worker 每轮只 await 一次 get()，平仓 / TP1 / sync_tp1 请求优先于信号出队；
+同优先级按投递顺序（FIFO）。
+"""
+import asyncio
+import itertools
+from typing import Dict, Tuple
+
+PRIO_CLOSE = 0
+PRIO_SIGNAL = 1
+
+
+class UserInbox:
+    """
+    单用户收件箱
+
+    - 信号：put_signal_nowait，积压达到 signal_max 时抛 asyncio.QueueFull（由扇出方丢弃计数）
+    - 平仓请求：await put_close，积压达到 close_max 时等待（背压，不丢弃）
+    """
+    __slots__ = ("signal_max", "_queue", "_seq", "_signals", "_close_slots")
+
+    def __init__(self, signal_max: int, close_max: int):
+        self.signal_max = signal_max
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._signals = 0
+        self._close_slots = asyncio.Semaphore(close_max)
+
+    def put_signal_nowait(self, signal: Dict) -> None:
+        if self._signals >= self.signal_max:
+            raise asyncio.QueueFull
+        self._signals += 1
+        self._queue.put_nowait((PRIO_SIGNAL, next(self._seq), signal))
+
+    async def put_close(self, request: Dict) -> None:
+        await self._close_slots.acquire()
+        self._queue.put_nowait((PRIO_CLOSE, next(self._seq), request))
+
+    async def get(self) -> Tuple[int, Dict]:
+        """返回 (优先级, 内容)"""
+        prio, _, item = await self._queue.get()
+        if prio == PRIO_SIGNAL:
+            self._signals -= 1
+        else:
+            self._close_slots.release()
+        return prio, item
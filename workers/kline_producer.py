@@ -3,48 +3,103 @@ K线生产者 — 订阅 K 线、驱动 BrooksStrategy、分发信号
 """
 import asyncio
 import logging
-from typing import Dict, List, Optional
+import random
+import time
+from collections import deque
+from typing import Dict, Optional
 
-import pandas as pd
 from binance import BinanceSocketManager, AsyncClient
 from binance.exceptions import ReadLoopClosed
 
-from config import SYMBOL as CONFIG_SYMBOL, OBSERVE_MODE
+from config import SYMBOL as CONFIG_SYMBOL, OBSERVE_MODE, BSM_QUEUE_SIZE
 from strategy import BrooksStrategy
 from trade_logger import TradeLogger
-from workers.helpers import load_historical_klines, fill_missing_klines
+from workers.helpers import KlineBuffer, load_historical_klines, fill_missing_klines
+from workers.inbox import UserInbox
 from logic.constants import signal_side, is_spike_signal
 
+# 连接类异常（触发重连）；websockets 不可用时不回退为 Exception，避免吞掉所有错误
 try:
     from websockets.exceptions import ConnectionClosed
+    _WS_EXC = (ConnectionClosed, ConnectionError, OSError)
 except ImportError:
-    ConnectionClosed = Exception  # type: ignore
+    _WS_EXC = (ConnectionError, OSError)
+_RECONNECT_EXC = (ReadLoopClosed, *_WS_EXC)
 
 SYMBOL = CONFIG_SYMBOL
 INTERVAL = AsyncClient.KLINE_INTERVAL_5MINUTE
 
+# 重连退避（参照 websockets 库默认值）：首次失败随机 0~5 秒，之后按黄金比例递增并加抖动
+BACKOFF_INITIAL = 5.0
+BACKOFF_MIN = 1.92
+BACKOFF_FACTOR = 1.618
+BACKOFF_MAX = 60.0
+# 连接存活超过该秒数视为稳定会话，断开后立即重连
+STABLE_SESSION_SECONDS = 60.0
+# 消息处理错误风暴：窗口内错误达到该数量时放弃当前连接，走重连退避
+MSG_ERROR_STORM_COUNT = 20
+MSG_ERROR_STORM_SECONDS = 10.0
+
+
+def _backoff_delay(attempt: int, session_age: float) -> float:
+    """第 attempt 次连续失败后的等待秒数；抖动避免大量客户端同步重连"""
+    if session_age > STABLE_SESSION_SECONDS:
+        return 0.0
+    if attempt <= 1:
+        return random.random() * BACKOFF_INITIAL
+    return min(BACKOFF_MIN * BACKOFF_FACTOR ** (attempt - 1), BACKOFF_MAX) + random.random()
+
+
+class SignalFanout:
+    """
+    信号扇出到各用户收件箱
+
+    非阻塞写入，在同一调度周期内写完所有用户；某个用户信号积压已满时丢弃该条信号并计数，
+    不阻塞生产者和其他用户（信号过时即失效，宁丢勿等）。
+    """
+    __slots__ = ("inboxes", "dropped")
+
+    def __init__(self, inboxes: Dict[str, UserInbox]):
+        self.inboxes = inboxes
+        self.dropped = 0
+
+    def multicast_nowait(self, msg: Dict) -> None:
+        for name, inbox in self.inboxes.items():
+            try:
+                inbox.put_signal_nowait(msg)
+            except asyncio.QueueFull:
+                self.dropped += 1
+                logging.warning(
+                    "[%s] 信号积压已满（%d），丢弃信号 %s，累计丢弃 %d 条",
+                    name, inbox.signal_max, msg.get("signal"), self.dropped,
+                )
+
 
 async def kline_producer(
-    user_queues: List[asyncio.Queue],
-    close_queues: Dict[str, asyncio.Queue],
+    inboxes: Dict[str, UserInbox],
     strategy: BrooksStrategy,
     trade_logger: TradeLogger,
 ) -> None:
-    history: List[Dict] = []
+    history = KlineBuffer()
+    fanout = SignalFanout(inboxes)
     kline_count = 0
     reconnect_attempt = 0
     max_reconnect_attempts = 10
-    base_delay = 1
     client: Optional[AsyncClient] = None
     last_kline_timestamp: Optional[int] = None
+    loop = asyncio.get_running_loop()
+    connected_at: Optional[float] = None
+    msg_errors: deque = deque(maxlen=MSG_ERROR_STORM_COUNT)
 
     while reconnect_attempt < max_reconnect_attempts:
         try:
-            logging.info(
-                f"正在连接 Binance API，订阅 {SYMBOL} {INTERVAL} K线数据..."
-                + (f" (重连尝试 {reconnect_attempt + 1}/{max_reconnect_attempts})"
-                   if reconnect_attempt > 0 else "")
-            )
+            if reconnect_attempt > 0:
+                logging.info(
+                    "正在连接 Binance API，订阅 %s %s K线数据... (重连尝试 %d/%d)",
+                    SYMBOL, INTERVAL, reconnect_attempt + 1, max_reconnect_attempts,
+                )
+            else:
+                logging.info("正在连接 Binance API，订阅 %s %s K线数据...", SYMBOL, INTERVAL)
 
             try:
                 if client is not None:
@@ -55,7 +110,7 @@ async def kline_producer(
                 client = await AsyncClient.create()
                 logging.info("Binance 客户端已创建")
             except Exception as e:
-                logging.error(f"创建 Binance 客户端失败: {e}", exc_info=True)
+                logging.error("创建 Binance 客户端失败: %s", e, exc_info=True)
                 raise
 
             if reconnect_attempt == 0:
@@ -64,22 +119,23 @@ async def kline_producer(
                 last_kline_timestamp = await fill_missing_klines(client, history, last_kline_timestamp)
 
             if len(history) >= 50:
-                df = pd.DataFrame(history)
+                df = history.to_dataframe()
                 result = strategy.on_new_bar(df)
                 logging.info(
-                    f"市场状态扫描完成: state={strategy.mstate.state.value} "
-                    f"AI={strategy.mstate.always_in.name}"
+                    "市场状态扫描完成: state=%s AI=%s",
+                    strategy.mstate.state.value, strategy.mstate.always_in.name,
                 )
 
-            bm = BinanceSocketManager(client, max_queue_size=10000)
+            bm = BinanceSocketManager(client, max_queue_size=BSM_QUEUE_SIZE)
             kline_stream = bm.kline_futures_socket(symbol=SYMBOL, interval=INTERVAL)
-            logging.info(f"合约K线 WebSocket 流已创建: {SYMBOL} {INTERVAL}")
+            logging.info("合约K线 WebSocket 流已创建: %s %s", SYMBOL, INTERVAL)
 
             reconnect_attempt = 0
             kline_count = len(history)
 
             try:
                 async with kline_stream as stream:
+                    connected_at = loop.time()
                     logging.info("WebSocket 连接已建立，开始接收实时 K 线数据...")
                     while True:
                         try:
@@ -91,58 +147,52 @@ async def kline_producer(
                             if not k:
                                 continue
 
-                            current_price = float(k.get("c", 0))
-                            if current_price <= 0:
-                                current_price = float(k.get("l", 0))
+                            # 收盘价每条消息只解析一次，收盘棒复用；字段缺失或非法时跳过该消息
+                            try:
+                                close_price = float(k["c"])
+                                current_price = close_price if close_price > 0 else float(k["l"])
+                            except (KeyError, TypeError, ValueError):
+                                continue
 
                             await _check_stop_loss_take_profit(
-                                trade_logger, close_queues, current_price, check_stop_loss=False
+                                trade_logger, inboxes, current_price, check_stop_loss=False
                             )
 
                             if not k.get("x"):
                                 continue
 
-                            close_price = float(k.get("c", 0))
                             await _check_stop_loss_take_profit(
-                                trade_logger, close_queues, close_price, check_stop_loss=True
+                                trade_logger, inboxes, close_price, check_stop_loss=True
                             )
 
                             kline_count += 1
                             kline_open_time = int(k.get("t", 0))
+                            o, h, l = float(k["o"]), float(k["h"]), float(k["l"])
                             logging.info(
-                                f"K线收盘 #{kline_count}: O={float(k['o']):.2f} "
-                                f"H={float(k['h']):.2f} L={float(k['l']):.2f} C={float(k['c']):.2f}"
+                                "K线收盘 #%d: O=%.2f H=%.2f L=%.2f C=%.2f",
+                                kline_count, o, h, l, close_price,
                             )
 
-                            kline_data = {
-                                "timestamp": kline_open_time,
-                                "open": float(k["o"]),
-                                "high": float(k["h"]),
-                                "low": float(k["l"]),
-                                "close": float(k["c"]),
-                            }
                             last_kline_timestamp = kline_open_time
-                            history.append(kline_data)
-                            while len(history) > 500:
-                                history.pop(0)
+                            history.append(kline_open_time, o, h, l, close_price)
 
                             if len(history) < 50:
                                 continue
 
-                            df = pd.DataFrame(history)
+                            df = history.to_dataframe()
                             result = strategy.on_new_bar(df)
 
                             trade_logger.increment_kline()
 
-                            for u in list(trade_logger.positions.keys()):
-                                if trade_logger.needs_tp1_fill_sync(u) and u in close_queues:
-                                    await close_queues[u].put({"action": "sync_tp1"})
+                            for u in tuple(trade_logger.positions):
+                                inbox = inboxes.get(u)
+                                if inbox is not None and trade_logger.needs_tp1_fill_sync(u):
+                                    await inbox.put_close({"action": "sync_tp1"})
 
                             if result is not None:
                                 signal = _build_signal(result)
                                 _log_signal(signal)
-                                for q in user_queues:
-                                    await q.put(signal)
+                                fanout.multicast_nowait(signal)
 
                         except asyncio.CancelledError:
                             logging.info("K线生产者任务已取消")
@@ -150,32 +200,47 @@ async def kline_producer(
                         except ReadLoopClosed:
                             logging.warning("WebSocket 读取循环已关闭，准备重连...")
                             raise
-                        except (ConnectionClosed, ConnectionError, OSError) as e:
-                            logging.warning(f"WebSocket 连接断开: {e}")
+                        except _WS_EXC as e:
+                            logging.warning("WebSocket 连接断开: %s", e)
                             raise
                         except Exception as e:
-                            logging.error(f"处理 K 线消息时出错: {e}", exc_info=True)
-                            await asyncio.sleep(1)
+                            logging.error("处理 K 线消息时出错: %s", e, exc_info=True)
+                            # 不休眠：单条坏消息直接跳过；持续出错才中断连接
+                            now = time.monotonic()
+                            msg_errors.append(now)
+                            if (
+                                len(msg_errors) == MSG_ERROR_STORM_COUNT
+                                and now - msg_errors[0] < MSG_ERROR_STORM_SECONDS
+                            ):
+                                msg_errors.clear()
+                                raise RuntimeError(
+                                    f"{MSG_ERROR_STORM_SECONDS:.0f} 秒内 K 线消息处理出错 "
+                                    f"{MSG_ERROR_STORM_COUNT} 次"
+                                ) from e
 
             except asyncio.CancelledError:
                 raise
-            except (ReadLoopClosed, ConnectionClosed, ConnectionError, OSError) as e:
-                logging.warning(f"WebSocket 连接错误: {e}")
+            except _RECONNECT_EXC as e:
+                logging.warning("WebSocket 连接错误: %s", e)
+                session_age = loop.time() - connected_at if connected_at is not None else 0.0
+                connected_at = None
                 reconnect_attempt += 1
                 if client is not None:
                     try:
                         await client.close_connection()
                     except Exception:
                         pass
-                delay = min(base_delay * (2 ** reconnect_attempt), 60)
-                logging.info(f"等待 {delay} 秒后尝试重连...")
+                delay = _backoff_delay(reconnect_attempt, session_age)
+                logging.info("等待 %.1f 秒后尝试重连...", delay)
                 await asyncio.sleep(delay)
                 continue
 
         except asyncio.CancelledError:
             break
         except Exception as e:
-            logging.error(f"K线生产者发生未预期的错误: {e}", exc_info=True)
+            logging.error("K线生产者发生未预期的错误: %s", e, exc_info=True)
+            session_age = loop.time() - connected_at if connected_at is not None else 0.0
+            connected_at = None
             reconnect_attempt += 1
             if client is not None:
                 try:
@@ -183,10 +248,9 @@ async def kline_producer(
                 except Exception:
                     pass
             if reconnect_attempt >= max_reconnect_attempts:
-                logging.error(f"达到最大重连次数 ({max_reconnect_attempts})，停止重连")
+                logging.error("达到最大重连次数 (%d)，停止重连", max_reconnect_attempts)
                 break
-            delay = min(base_delay * (2 ** reconnect_attempt), 60)
-            await asyncio.sleep(delay)
+            await asyncio.sleep(_backoff_delay(reconnect_attempt, session_age))
 
     try:
         await client.close_connection()
@@ -196,55 +260,55 @@ async def kline_producer(
 
 async def _check_stop_loss_take_profit(
     trade_logger: TradeLogger,
-    close_queues: Dict[str, asyncio.Queue],
+    inboxes: Dict[str, UserInbox],
     current_price: float,
     check_stop_loss: bool = True,
 ) -> None:
-    if current_price <= 0:
+    positions = trade_logger.positions
+    if current_price <= 0 or not positions:
         return
-    for user_name in list(trade_logger.positions.keys()):
-        trade = trade_logger.positions.get(user_name)
+    check = trade_logger.check_stop_loss_take_profit
+    # 平仓会修改 positions，遍历快照
+    for user_name, trade in tuple(positions.items()):
         if trade is None:
             continue
-        result = trade_logger.check_stop_loss_take_profit(
-            user_name, current_price, check_stop_loss=check_stop_loss
-        )
+        result = check(user_name, current_price, check_stop_loss=check_stop_loss)
         if not result:
             continue
 
+        # 观察模式不下单；实盘只发给有收件箱的用户
+        inbox = None if OBSERVE_MODE else inboxes.get(user_name)
         if isinstance(result, dict) and result.get("action") == "tp1":
             tp1_info = result
-            logging.info(
-                f"[{user_name}] TP1触发: 平仓50% @ {tp1_info['close_price']:.2f}"
-            )
-            if not OBSERVE_MODE and user_name in close_queues:
-                tp1_request = {
+            trade = tp1_info["trade"]
+            logging.info("[%s] TP1触发: 平仓50%% @ %.2f", user_name, tp1_info["close_price"])
+            if inbox is not None:
+                await inbox.put_close({
                     "action": "tp1",
-                    "side": "SELL" if tp1_info["trade"].side.lower() == "buy" else "BUY",
+                    "side": "SELL" if trade.side.lower() == "buy" else "BUY",
                     "close_quantity": tp1_info["close_quantity"],
                     "close_price": tp1_info["close_price"],
                     "new_stop_loss": tp1_info["new_stop_loss"],
                     "tp2_price": tp1_info["tp2_price"],
-                    "remaining_quantity": tp1_info["trade"].remaining_quantity,
-                    "entry_price": float(tp1_info["trade"].entry_price),
-                    "position_side": tp1_info["trade"].side,
-                }
-                await close_queues[user_name].put(tp1_request)
+                    "remaining_quantity": trade.remaining_quantity,
+                    "entry_price": trade.entry_price,
+                    "position_side": trade.side,
+                })
         else:
+            # TradeLogger 在开仓 / 平仓处已统一为 float，这里不再重复转换
             closed_trade = result
             logging.info(
-                f"[{user_name}] {closed_trade.exit_reason}: "
-                f"价格={current_price:.2f}, 盈亏={closed_trade.pnl:.4f} USDT"
+                "[%s] %s: 价格=%.2f, 盈亏=%.4f USDT",
+                user_name, closed_trade.exit_reason, current_price, closed_trade.pnl,
             )
-            if not OBSERVE_MODE and user_name in close_queues:
-                close_request = {
+            if inbox is not None:
+                await inbox.put_close({
                     "action": "close",
                     "side": closed_trade.side,
-                    "quantity": float(closed_trade.remaining_quantity or closed_trade.quantity),
-                    "exit_price": float(closed_trade.exit_price),
+                    "quantity": closed_trade.remaining_quantity or closed_trade.quantity,
+                    "exit_price": closed_trade.exit_price,
                     "exit_reason": closed_trade.exit_reason,
-                }
-                await close_queues[user_name].put(close_request)
+                })
 
 
 def _build_signal(result) -> Dict:
@@ -271,6 +335,7 @@ def _log_signal(signal: Dict) -> None:
     tp2 = signal.get("tp2_price", 0)
     entry_type = "市价" if signal.get("is_spike") else "限价"
     logging.info(
-        f"信号: {signal['signal']} {signal['side']} @ {signal['price']:.2f} ({entry_type}), "
-        f"SL={signal['stop_loss']:.2f}, TP1={tp1:.2f}, TP2={tp2:.2f}"
+        "信号: %s %s @ %.2f (%s), SL=%.2f, TP1=%.2f, TP2=%.2f",
+        signal["signal"], signal["side"], signal["price"], entry_type,
+        signal["stop_loss"], tp1, tp2,
     )
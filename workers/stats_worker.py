@@ -61,22 +61,19 @@ async def print_stats_periodically(
             )
             user_stats_list.append(stats_msg)
         
-        # 根据是否有活动选择日志级别
-        log_func = logging.info if has_activity else logging.debug
-        
-        log_func("=" * 60)
-        log_func(f"定期交易统计 ({mode_label}):")
-        
-        # 只在有活动时打印到控制台
-        if has_activity:
-            print("\n" + "=" * 60)
-            print(f"📊 定期交易统计 ({mode_label}):")
-        
-        for stats_msg in user_stats_list:
-            log_func(stats_msg)
-            if has_activity:
-                print(stats_msg)
-        
-        log_func("=" * 60)
-        if has_activity:
-            print("=" * 60 + "\n")
+        # 快照在事件循环内采集（positions 只在循环内修改），输出交给线程，
+        # 控制台写阻塞时不卡住行情 / 下单协程
+        await asyncio.to_thread(_emit_stats, mode_label, user_stats_list, has_activity)
+
+
+def _emit_stats(mode_label: str, user_stats_list: List[str], has_activity: bool) -> None:
+    """输出一次统计快照（在工作线程中执行）"""
+    # 根据是否有活动选择日志级别
+    log_func = logging.info if has_activity else logging.debug
+
+    # 控制台输出由日志的 stdout 处理器负责（有活动时 INFO 可见）
+    log_func("=" * 60)
+    log_func("定期交易统计 (%s):", mode_label)
+    for stats_msg in user_stats_list:
+        log_func(stats_msg)
+    log_func("=" * 60)
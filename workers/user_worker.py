@@ -8,19 +8,33 @@ import asyncio
 import logging
 from typing import Dict, Optional
 
-from config import LEVERAGE, SYMBOL as CONFIG_SYMBOL, OBSERVE_MODE
+from config import (
+    LEVERAGE, SYMBOL as CONFIG_SYMBOL, OBSERVE_MODE,
+    OBSERVE_BALANCE, POSITION_SIZE_PERCENT,
+)
 from trade_logger import TradeLogger
 from user_manager import TradingUser
 from order_executor import execute_observe_order, execute_live_order, handle_close_request, _cancel_related_orders
 from workers.helpers import calculate_order_quantity
+from workers.inbox import PRIO_CLOSE, UserInbox
 
 SYMBOL = CONFIG_SYMBOL
 
+# 开仓计算仓位时余额缓存有效期（秒）；成交 / 平仓后缓存失效，下次强制刷新
+SIZING_BALANCE_TTL = 2.0
+
+# 动态反手阈值：市场状态 -> 新信号强度需达到当前持仓强度的倍数
+REVERSAL_THRESHOLDS: Dict[str, float] = {
+    "Breakout": 1.5,
+    "StrongTrend": 1.5,
+    "TradingRange": 1.3,  # 问题5修复：提高震荡市阈值
+}
+DEFAULT_REVERSAL_THRESHOLD = 1.2
+
 
 async def user_worker(
-    user: TradingUser, 
-    signal_queue: asyncio.Queue, 
-    close_queue: asyncio.Queue,
+    user: TradingUser,
+    inbox: UserInbox,
     trade_logger: TradeLogger
 ) -> None:
     """
@@ -28,7 +42,7 @@ async def user_worker(
     
     消费信号并为该用户下单（观察模式或实际下单）
     """
-    logging.info(f"用户工作线程 [{user.name}] 已启动")
+    logging.info("用户工作线程 [%s] 已启动", user.name)
 
     sync_task: Optional[asyncio.Task] = None
     if not OBSERVE_MODE:
@@ -37,50 +51,36 @@ async def user_worker(
         await _recover_binance_position(user, trade_logger)
         # 定期校准（每 60 秒对比币安与本地持仓）
         sync_task = asyncio.create_task(_position_sync_loop(user, trade_logger))
-        logging.info(f"[{user.name}] 持仓校准任务已启动，间隔 {POSITION_SYNC_INTERVAL}s")
+        logging.info("[%s] 持仓校准任务已启动，间隔 %ss", user.name, POSITION_SYNC_INTERVAL)
 
     signal_count = 0
     try:
         while True:
             try:
-                # 等待信号或平仓请求（TP1 是否触发在 K 线周期结束时由 kline_producer 投递 sync_tp1 检测）
-                signal_task = asyncio.create_task(signal_queue.get())
-                close_task = asyncio.create_task(close_queue.get())
-                done, pending = await asyncio.wait(
-                    [signal_task, close_task],
-                    return_when=asyncio.FIRST_COMPLETED
-                )
-                for task in pending:
-                    task.cancel()
-                    try:
-                        await task
-                    except asyncio.CancelledError:
-                        pass
-                completed_task = close_task if close_task in done else signal_task
-                result = completed_task.result()
-
-                # 周期结束时 TP1 触发检测（由 kline_producer 在 K 线收盘时投递）
-                if isinstance(result, dict) and result.get("action") == "sync_tp1":
-                    if not OBSERVE_MODE:
-                        await _sync_tp1_if_filled(user, trade_logger)
-                    continue
+                # 单一收件箱：平仓 / TP1 / sync_tp1 请求优先于信号出队
+                # （TP1 是否触发在 K 线周期结束时由 kline_producer 投递 sync_tp1 检测）
+                prio, item = await inbox.get()
 
-                # 处理平仓请求（优先级高）
-                if completed_task == close_task or (isinstance(result, dict) and result.get("action") in ["close", "tp1"]):
-                    if not OBSERVE_MODE:
-                        await handle_close_request(user, result, trade_logger)
+                if prio == PRIO_CLOSE:
+                    if OBSERVE_MODE:
+                        continue
+                    if item.get("action") == "sync_tp1":
+                        await _sync_tp1_if_filled(user, trade_logger)
+                    else:
+                        await handle_close_request(user, item, trade_logger)
+                    user.invalidate_balance_cache()
                     continue
 
                 # 处理信号
-                signal: Dict = result
+                signal: Dict = item
                 signal_count += 1
                 logging.info(
-                    f"[{user.name}] 收到信号 #{signal_count}: {signal['signal']} {signal['side']} @ {signal['price']:.2f}"
+                    "[%s] 收到信号 #%d: %s %s @ %.2f",
+                    user.name, signal_count, signal["signal"], signal["side"], signal["price"],
                 )
 
                 # 检查冷却期和反手条件
                 if not _should_process_signal(user, signal, trade_logger):
-                    signal_queue.task_done()
                     continue
 
                 # 计算下单数量
@@ -92,22 +92,16 @@ async def user_worker(
                         trade_logger, calculate_order_quantity
                     )
                 else:
-                    success = await execute_live_order(
-                        user, signal, order_qty, position_value,
-                        trade_logger, signal_queue
+                    await execute_live_order(
+                        user, signal, order_qty, position_value, trade_logger
                     )
-                    if not success:
-                        signal_queue.task_done()
-                        continue
-
-                signal_queue.task_done()
+                    user.invalidate_balance_cache()
 
             except asyncio.CancelledError:
-                logging.info(f"用户工作线程 [{user.name}] 已取消")
+                logging.info("用户工作线程 [%s] 已取消", user.name)
                 break
             except Exception as e:
-                logging.error(f"用户工作线程 [{user.name}] 出错: {e}", exc_info=True)
-                signal_queue.task_done()
+                logging.error("用户工作线程 [%s] 出错: %s", user.name, e, exc_info=True)
     finally:
         if sync_task is not None:
             sync_task.cancel()
@@ -115,45 +109,42 @@ async def user_worker(
                 await sync_task
             except asyncio.CancelledError:
                 pass
-            logging.info(f"[{user.name}] 持仓校准任务已停止")
+            logging.info("[%s] 持仓校准任务已停止", user.name)
 
 
 async def _setup_live_trading(user: TradingUser) -> None:
     """设置实盘交易环境"""
-    logging.info(f"正在为用户 [{user.name}] 连接 Binance API...")
+    logging.info("正在为用户 [%s] 连接 Binance API...", user.name)
     await user.connect()
-    logging.info(f"用户 [{user.name}] 已连接 Binance API")
+    logging.info("用户 [%s] 已连接 Binance API", user.name)
     
-    # 获取交易规则
-    try:
-        filters = await user.get_symbol_filters(SYMBOL)
+    # 交易规则 / 杠杆 / 余额互不依赖，并发请求，各自处理异常
+    filters, leverage_ok, initial_balance = await asyncio.gather(
+        user.get_symbol_filters(SYMBOL),
+        user.set_leverage(SYMBOL, leverage=LEVERAGE),
+        user.get_futures_balance(),
+        return_exceptions=True,
+    )
+
+    if isinstance(filters, Exception):
+        logging.warning("[%s] 获取交易规则失败: %s，将使用默认值", user.name, filters)
+    else:
         logging.info(
-            f"[{user.name}] 获取交易规则: stepSize={filters['stepSize']}, "
-            f"minQty={filters['minQty']}, tickSize={filters['tickSize']}"
+            "[%s] 获取交易规则: stepSize=%s, minQty=%s, tickSize=%s",
+            user.name, filters["stepSize"], filters["minQty"], filters["tickSize"],
         )
-    except Exception as e:
-        logging.warning(f"[{user.name}] 获取交易规则失败: {e}，将使用默认值")
-    
-    # 设置杠杆
-    leverage_ok = await user.set_leverage(SYMBOL, leverage=LEVERAGE)
-    if not leverage_ok:
-        logging.error(f"[{user.name}] 设置杠杆失败，交易可能使用错误的杠杆倍数！")
-    
-    # 显示初始余额
-    try:
-        initial_balance = await user.get_futures_balance()
+
+    if isinstance(leverage_ok, Exception) or not leverage_ok:
+        logging.error("[%s] 设置杠杆失败，交易可能使用错误的杠杆倍数！", user.name)
+
+    if isinstance(initial_balance, Exception):
+        logging.error("[%s] 获取初始余额失败: %s", user.name, initial_balance)
+    else:
         position_pct = user.calculate_position_size_percent(initial_balance)
         logging.info(
-            f"[{user.name}] 实盘模式: 余额={initial_balance:.2f} USDT, "
-            f"仓位比例={position_pct:.0f}%, 杠杆={LEVERAGE}x"
-        )
-        print(
-            f"[{user.name}] 实盘模式: 余额={initial_balance:.2f} USDT, "
-            f"仓位比例={position_pct:.0f}% ({'全仓' if position_pct == 100 else '20%仓位'}), "
-            f"杠杆={LEVERAGE}x"
+            "[%s] 实盘模式: 余额=%.2f USDT, 仓位比例=%.0f%%, 杠杆=%sx",
+            user.name, initial_balance, position_pct, LEVERAGE,
         )
-    except Exception as e:
-        logging.error(f"[{user.name}] 获取初始余额失败: {e}")
 
 
 async def _recover_binance_position(user: TradingUser, trade_logger: TradeLogger) -> None:
@@ -163,7 +154,7 @@ async def _recover_binance_position(user: TradingUser, trade_logger: TradeLogger
         position_info = await user.get_position_info(SYMBOL)
         
         if not position_info:
-            logging.info(f"[{user.name}] 币安无持仓，无需恢复")
+            logging.info("[%s] 币安无持仓，无需恢复", user.name)
             return
         
         # 获取当前价格（用于计算止损止盈）
@@ -171,11 +162,11 @@ async def _recover_binance_position(user: TradingUser, trade_logger: TradeLogger
             ticker = await user.client.futures_symbol_ticker(symbol=SYMBOL)
             current_price = float(ticker.get("price", 0))
         except Exception as e:
-            logging.warning(f"[{user.name}] 获取当前价格失败: {e}，使用标记价格")
+            logging.warning("[%s] 获取当前价格失败: %s，使用标记价格", user.name, e)
             current_price = position_info.get("markPrice", position_info.get("entryPrice", 0))
         
         if current_price <= 0:
-            logging.error(f"[{user.name}] 无法获取有效价格，跳过持仓恢复")
+            logging.error("[%s] 无法获取有效价格，跳过持仓恢复", user.name)
             return
         
         # 获取 ATR（用于计算止损距离）
@@ -192,9 +183,9 @@ async def _recover_binance_position(user: TradingUser, trade_logger: TradeLogger
         
         if trade:
             logging.info(
-                f"[{user.name}] ✅ 成功恢复持仓: "
-                f"{trade.side.upper()} {trade.quantity:.6f} BTC @ {trade.entry_price:.2f}, "
-                f"止损={trade.stop_loss:.2f}, TP1={trade.tp1_price:.2f}(1R), TP2={trade.tp2_price:.2f}(2R)"
+                "[%s] ✅ 成功恢复持仓: %s %.6f BTC @ %.2f, 止损=%.2f, TP1=%.2f(1R), TP2=%.2f(2R)",
+                user.name, trade.side.upper(), trade.quantity, trade.entry_price,
+                trade.stop_loss, trade.tp1_price, trade.tp2_price,
             )
             
             # 恢复后立即检查是否已经达到 TP1（使用原始策略逻辑）
@@ -205,19 +196,19 @@ async def _recover_binance_position(user: TradingUser, trade_logger: TradeLogger
                 if tp1_result and isinstance(tp1_result, dict) and tp1_result.get("action") == "tp1":
                     # TP1 已触发，发送到队列处理
                     logging.info(
-                        f"[{user.name}] 🎯 恢复持仓时检测到 TP1 已触发: "
-                        f"当前价={current_price:.2f} >= TP1={trade.tp1_price:.2f}, "
-                        f"将在下个周期执行 50% 止盈"
+                        "[%s] 🎯 恢复持仓时检测到 TP1 已触发: 当前价=%.2f >= TP1=%.2f, "
+                        "将在下个周期执行 50%% 止盈",
+                        user.name, current_price, trade.tp1_price,
                     )
                     # 注意：这里不立即执行，而是等待下一个 K 线周期
                     # 因为需要确保所有系统状态都已恢复
             except Exception as check_err:
-                logging.warning(f"[{user.name}] 恢复后检查 TP1 失败: {check_err}")
+                logging.warning("[%s] 恢复后检查 TP1 失败: %s", user.name, check_err)
         else:
-            logging.warning(f"[{user.name}] ⚠️ 持仓恢复失败")
+            logging.warning("[%s] ⚠️ 持仓恢复失败", user.name)
         
     except Exception as e:
-        logging.error(f"[{user.name}] 恢复币安持仓失败: {e}", exc_info=True)
+        logging.error("[%s] 恢复币安持仓失败: %s", user.name, e, exc_info=True)
 
 
 # 持仓校准间隔（秒）
@@ -237,7 +228,7 @@ async def _position_sync_alignment(user: TradingUser, trade_logger: TradeLogger)
         
         # API 失败时跳过本次校准，避免误判
         if real.get("api_error"):
-            logging.debug(f"[{user.name}] 持仓校准: API 调用失败，跳过本次")
+            logging.debug("[%s] 持仓校准: API 调用失败，跳过本次", user.name)
             return
 
         # 币安无仓位，本地有记录 -> 外部平仓（手动/强平/TP2/SL 被交易所触发等）
@@ -259,8 +250,9 @@ async def _position_sync_alignment(user: TradingUser, trade_logger: TradeLogger)
             )
             if closed:
                 logging.warning(
-                    f"[{user.name}] 实盘对齐: 币安已无仓位，本地持仓已标记为外部平仓 "
-                    f"(exit_price={exit_price:.2f})，已清理所有挂单"
+                    "[%s] 实盘对齐: 币安已无仓位，本地持仓已标记为外部平仓 "
+                    "(exit_price=%.2f)，已清理所有挂单",
+                    user.name, exit_price,
                 )
             return
 
@@ -285,8 +277,8 @@ async def _position_sync_alignment(user: TradingUser, trade_logger: TradeLogger)
             )
             if trade:
                 logging.info(
-                    f"[{user.name}] 实盘对齐: 发现孤儿持仓，已从币安恢复并挂载 2% ATR 紧急止损 "
-                    f"({trade.side.upper()} {trade.quantity:.6f} @ {trade.entry_price:.2f})"
+                    "[%s] 实盘对齐: 发现孤儿持仓，已从币安恢复并挂载 2%% ATR 紧急止损 (%s %.6f @ %.2f)",
+                    user.name, trade.side.upper(), trade.quantity, trade.entry_price,
                 )
             return
         
@@ -300,9 +292,8 @@ async def _position_sync_alignment(user: TradingUser, trade_logger: TradeLogger)
             # 方向不一致（极端异常，可能手动反手了）
             if binance_side != local_side:
                 logging.warning(
-                    f"[{user.name}] ⚠️ 实盘对齐: 方向不一致! "
-                    f"币安={binance_side.upper()} {binance_qty:.6f}, "
-                    f"本地={local_side.upper()} {local_qty:.6f}，将以币安为准重建"
+                    "[%s] ⚠️ 实盘对齐: 方向不一致! 币安=%s %.6f, 本地=%s %.6f，将以币安为准重建",
+                    user.name, binance_side.upper(), binance_qty, local_side.upper(), local_qty,
                 )
                 # 强制关闭本地记录，重新恢复
                 trade_logger.force_close_position(
@@ -327,8 +318,8 @@ async def _position_sync_alignment(user: TradingUser, trade_logger: TradeLogger)
             # 数量差异超过 5%（排除小数点精度误差）
             if local_qty > 0 and abs(binance_qty - local_qty) / local_qty > 0.05:
                 logging.info(
-                    f"[{user.name}] 实盘对齐: 数量不一致 "
-                    f"(币安={binance_qty:.6f}, 本地={local_qty:.6f})，同步中..."
+                    "[%s] 实盘对齐: 数量不一致 (币安=%.6f, 本地=%.6f)，同步中...",
+                    user.name, binance_qty, local_qty,
                 )
                 # 更新本地数量（可能是手动加仓/减仓，或 TP1 未同步）
                 local_pos.remaining_quantity = binance_qty
@@ -340,7 +331,7 @@ async def _position_sync_alignment(user: TradingUser, trade_logger: TradeLogger)
                 trade_logger._redis_save_position(user.name, local_pos)
                 
     except Exception as e:
-        logging.warning(f"[{user.name}] 持仓校准失败: {e}")
+        logging.warning("[%s] 持仓校准失败: %s", user.name, e)
 
 
 async def _position_sync_loop(
@@ -373,11 +364,11 @@ async def _sync_tp1_if_filled(user: TradingUser, trade_logger: TradeLogger) -> N
             if ok:
                 await user.cancel_all_orders(SYMBOL)
                 logging.info(
-                    f"[{user.name}] TP1 已由交易所触发，已同步剩余仓位 {amt:.4f}，"
-                    "后续由程序决定止盈止损"
+                    "[%s] TP1 已由交易所触发，已同步剩余仓位 %.4f，后续由程序决定止盈止损",
+                    user.name, amt,
                 )
     except Exception as e:
-        logging.debug(f"[{user.name}] TP1 同步检测: {e}")
+        logging.debug("[%s] TP1 同步检测: %s", user.name, e)
 
 
 def _should_process_signal(
@@ -389,7 +380,7 @@ def _should_process_signal(
     # 检查冷却期
     if trade_logger.is_in_cooldown(user.name):
         logging.info(
-            f"⏳ [{user.name}] 在冷却期内，跳过信号: {signal['signal']} {signal['side']}"
+            "⏳ [%s] 在冷却期内，跳过信号: %s %s", user.name, signal["signal"], signal["side"]
         )
         return False
     
@@ -398,17 +389,13 @@ def _should_process_signal(
     market_state_str = signal.get("market_state", "")
     
     # 动态反手阈值
-    if market_state_str in ["Breakout", "StrongTrend"]:
-        reversal_threshold = 1.5
-    elif market_state_str == "TradingRange":
-        reversal_threshold = 1.3  # 问题5修复：提高震荡市阈值
-    else:
-        reversal_threshold = 1.2
+    reversal_threshold = REVERSAL_THRESHOLDS.get(market_state_str, DEFAULT_REVERSAL_THRESHOLD)
     
     if not trade_logger.should_allow_reversal(user.name, signal_strength, reversal_threshold):
         logging.info(
-            f"❌ [{user.name}] 反手信号强度不足，跳过: {signal['signal']} {signal['side']} "
-            f"(强度={signal_strength:.2f}, 阈值={reversal_threshold:.1f}x, 市场={market_state_str})"
+            "❌ [%s] 反手信号强度不足，跳过: %s %s (强度=%.2f, 阈值=%.1fx, 市场=%s)",
+            user.name, signal["signal"], signal["side"],
+            signal_strength, reversal_threshold, market_state_str,
         )
         return False
     
@@ -417,14 +404,12 @@ def _should_process_signal(
 
 async def _calculate_position(user: TradingUser, signal: Dict) -> tuple:
     """计算仓位和下单数量"""
-    from config import OBSERVE_BALANCE, POSITION_SIZE_PERCENT
-    
     if OBSERVE_MODE:
         order_qty = calculate_order_quantity(signal["price"])
         position_value = OBSERVE_BALANCE * (POSITION_SIZE_PERCENT / 100) * LEVERAGE
     else:
         try:
-            real_balance = await user.get_futures_balance(force_refresh=True)
+            real_balance = await user.get_futures_balance(ttl=SIZING_BALANCE_TTL)
             
             # 获取已占用的保证金（如果有未平仓的仓位）
             used_margin = await user.get_used_margin(SYMBOL)
@@ -432,8 +417,8 @@ async def _calculate_position(user: TradingUser, signal: Dict) -> tuple:
             
             if available_balance <= 0:
                 logging.warning(
-                    f"[{user.name}] ⚠️ 可用余额不足: 总余额={real_balance:.2f}, "
-                    f"已占用保证金={used_margin:.2f}, 可用余额={available_balance:.2f}"
+                    "[%s] ⚠️ 可用余额不足: 总余额=%.2f, 已占用保证金=%.2f, 可用余额=%.2f",
+                    user.name, real_balance, used_margin, available_balance,
                 )
                 return 0.0, 0.0
             
@@ -445,7 +430,7 @@ async def _calculate_position(user: TradingUser, signal: Dict) -> tuple:
             )
             
             if order_qty <= 0:
-                logging.warning(f"[{user.name}] ⚠️ 计算出的数量为 0，无法下单")
+                logging.warning("[%s] ⚠️ 计算出的数量为 0，无法下单", user.name)
                 return 0.0, 0.0
             
             position_pct = user.calculate_position_size_percent(available_balance)
@@ -453,20 +438,20 @@ async def _calculate_position(user: TradingUser, signal: Dict) -> tuple:
             
             if used_margin > 0:
                 logging.info(
-                    f"[{user.name}] 仓位计算: 总余额={real_balance:.2f} USDT, "
-                    f"已占用保证金={used_margin:.2f} USDT, 可用余额={available_balance:.2f} USDT, "
-                    f"仓位比例={position_pct:.0f}%, 杠杆={LEVERAGE}x, "
-                    f"下单数量={order_qty:.6f} BTC (≈{order_qty * signal['price']:.2f} USDT)"
+                    "[%s] 仓位计算: 总余额=%.2f USDT, 已占用保证金=%.2f USDT, 可用余额=%.2f USDT, "
+                    "仓位比例=%.0f%%, 杠杆=%sx, 下单数量=%.6f BTC (≈%.2f USDT)",
+                    user.name, real_balance, used_margin, available_balance,
+                    position_pct, LEVERAGE, order_qty, order_qty * signal["price"],
                 )
             else:
                 logging.info(
-                    f"[{user.name}] 仓位计算: 余额={real_balance:.2f} USDT, "
-                    f"仓位比例={position_pct:.0f}%, 杠杆={LEVERAGE}x, "
-                    f"下单数量={order_qty:.6f} BTC (≈{position_value:.2f} USDT), "
-                    f"stepSize={user._symbol_filters.get(SYMBOL, {}).get('stepSize', 'N/A')}"
+                    "[%s] 仓位计算: 余额=%.2f USDT, 仓位比例=%.0f%%, 杠杆=%sx, "
+                    "下单数量=%.6f BTC (≈%.2f USDT), stepSize=%s",
+                    user.name, real_balance, position_pct, LEVERAGE, order_qty, position_value,
+                    user._symbol_filters.get(SYMBOL, {}).get("stepSize", "N/A"),
                 )
         except Exception as e:
-            logging.error(f"[{user.name}] 获取余额失败: {e}，使用默认仓位")
+            logging.error("[%s] 获取余额失败: %s，使用默认仓位", user.name, e)
             order_qty = calculate_order_quantity(signal["price"])
             position_value = 0
     